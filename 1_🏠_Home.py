@@ -1,9 +1,14 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.express as px
+
+from dashboard.charts import age_box, age_histogram, correlation_heatmap, diagnosis_pie
+from dashboard.correlation import correlation_matrix, numeric_columns
+from dashboard.data import BINARY_COLUMNS, load_data
+from dashboard.figure_cache import cached_chart
+from dashboard.profiling import measure, plotly_chart, render_panel, start_rerun
+from dashboard.table import PAGE_SIZES, describe_stats, page_rows, select_rows
 
 st.set_page_config(layout="wide")
+start_rerun('Home')
 
 st.title("Dashboard - Alzheimer's Disease")
 
@@ -16,83 +21,95 @@ st.markdown("**Alunos:** João Pedro Araújo Ramalho & Kiev Luiz Freitas Guedes"
 st.markdown("### Dataset")
 st.markdown("[Alzheimer's Disease Dataset](https://www.kaggle.com/datasets/rabieelkharoua/alzheimers-disease-dataset/)")
 
-@st.cache_data
-def load_data():
-    try:
-        df = pd.read_csv('alzheimers_disease_data.csv')
-        df.drop(columns=["PatientID", "DoctorInCharge"], inplace=True)
-        return df
-    except FileNotFoundError:
-        st.error("'alzheimers_disease_data.csv' não encontrado")
-        return None
-
-df = load_data()
+with measure('load', 'load_data'):
+    df = load_data()
 
 if df is not None:
     st.header('Matriz de Correlação')
     st.write("Relação entre as variáveis do conjunto.")
 
-    corr_matrix = df.corr(numeric_only=True)
-    fig_corr = px.imshow(
-        corr_matrix,
-        text_auto=True,
-        aspect="auto",
-        labels=dict(color="Correlação"),
-        color_continuous_scale=px.colors.sequential.Viridis
-    )
-    fig_corr.update_layout(title='Matriz de Correlação das Variáveis Numéricas')
-    st.plotly_chart(fig_corr, use_container_width=True)
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        corr_method = st.radio(
+            "Método:",
+            ['pearson', 'spearman'],
+            format_func={'pearson': 'Pearson', 'spearman': 'Spearman'}.get,
+            horizontal=True
+        )
+    with col2:
+        all_columns = numeric_columns(df)
+        corr_columns = st.multiselect("Variáveis:", all_columns, placeholder="Todas")
+
+    def build_corr_figure():
+        with measure('compute', 'correlation_matrix'):
+            corr_matrix = correlation_matrix(df, corr_method, corr_columns or None)
+        return correlation_heatmap(corr_matrix)
+
+    fig_corr = cached_chart('correlation', df, build_corr_figure, method=corr_method, columns=tuple(corr_columns))
+    plotly_chart(fig_corr, use_container_width=True)
 
     st.header(f"Dataset e Estatísticas")
 
-    tab1, tab2 = st.tabs(["Tabela", "Estatísticas"])
+    # Diferente de st.tabs, só a visão escolhida é calculada a cada execução.
+    view = st.segmented_control("Exibir:", ["Tabela", "Estatísticas"], default="Tabela", label_visibility='collapsed')
 
-    with tab1:
+    if view != "Estatísticas":
         st.markdown(f"Dados dos {df.shape[0]} pacientes:")
 
-        st.dataframe(df)
-
-    with tab2:
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            sort_by = st.selectbox("Ordenar por:", [None, *df.columns], format_func=lambda c: c or "Ordem original")
+        with col2:
+            ascending = st.radio("Ordem:", [True, False], format_func=lambda a: "Crescente" if a else "Decrescente", horizontal=True)
+        with col3:
+            filter_column = st.selectbox("Filtrar por:", [None, *df.columns], format_func=lambda c: c or "Sem filtro")
+        with col4:
+            filters = {}
+            if filter_column is not None:
+                if df[filter_column].dtype == 'category' or filter_column in BINARY_COLUMNS:
+                    options = list(df[filter_column].cat.categories) if df[filter_column].dtype == 'category' else [0, 1]
+                    filters[filter_column] = st.multiselect("Valores:", options, default=options)
+                else:
+                    stats = describe_stats(df)
+                    min_val = float(stats.loc[filter_column, 'min'])
+                    max_val = float(stats.loc[filter_column, 'max'])
+                    filters[filter_column] = st.slider("Faixa:", min_val, max_val, (min_val, max_val))
+
+        col1, col2 = st.columns([1, 3])
+        with col1:
+            page_size = st.selectbox("Linhas por página:", PAGE_SIZES)
+        with measure('filter', 'select_rows'):
+            positions = select_rows(df, sort_by, ascending, filters)
+        total = len(df) if positions is None else len(positions)
+        n_pages = max(1, -(-total // page_size))
+        with col2:
+            page = st.number_input(f"Página (de {n_pages}):", min_value=1, max_value=n_pages, value=1) - 1
+
+        with measure('filter', 'page_rows'):
+            page_df = page_rows(df, positions, page, page_size)
+        st.dataframe(page_df)
+        st.caption(f"Linhas {page * page_size + 1 if total else 0}–{page * page_size + len(page_df)} de {total}.")
+
+    else:
         st.markdown("Estatística de cada variável:")
-        st.dataframe(df.describe().T)
+        with measure('compute', 'describe_stats'):
+            stats = describe_stats(df)
+        st.dataframe(stats)
 
 
     st.header('Análise do Diagnóstico e Idade')
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        fig_age_box = px.box(
-            df,
-            x='Diagnosis',
-            y='Age',
-            color='Diagnosis',
-            labels={'Age': 'Idade', 'Diagnosis': 'Diagnóstico'},
-            title='Distribuição da Idade por Diagnóstico'
-        )
-        st.plotly_chart(fig_age_box, use_container_width=True)
+        fig_age_box = cached_chart('age_box', df, lambda: age_box(df))
+        plotly_chart(fig_age_box, use_container_width=True)
 
     with col2:
-        fig_age_hist = px.histogram(
-            df,
-            x='Age',
-            color='Diagnosis',
-            nbins=20,
-            labels={'Age': 'Idade', 'count': 'Contagem'},
-            title='Distribuição da Idade por Diagnóstico'
-        )
-        st.plotly_chart(fig_age_hist, use_container_width=True)
+        fig_age_hist = cached_chart('age_histogram', df, lambda: age_histogram(df))
+        plotly_chart(fig_age_hist, use_container_width=True)
     
     with col3:
-        diagnosis_counts = df['Diagnosis'].value_counts().reset_index()
-        diagnosis_counts.columns = ['Diagnosis', 'Count']
-        
-        fig_pie_diagnosis = px.pie(
-            diagnosis_counts,
-            names='Diagnosis',
-            values='Count',
-            title='Proporção de Diagnósticos',
-            hole=0.3,
-            labels={'Diagnosis': 'Diagnóstico', 'Count': 'Número de Pacientes'}
-        )
-        fig_pie_diagnosis.update_traces(textposition='inside', textinfo='percent+label')
-        st.plotly_chart(fig_pie_diagnosis, use_container_width=True)
\ No newline at end of file
+        fig_pie_diagnosis = cached_chart('diagnosis_pie', df, lambda: diagnosis_pie(df))
+        plotly_chart(fig_pie_diagnosis, use_container_width=True)
+
+render_panel()
@@ -0,0 +1,200 @@
+"""
+Agregações de ``variável × Diagnosis`` usadas pelos gráficos de barras.
+
+Em vez de enviar todas as linhas para o Plotly contar no navegador, as
+contagens e porcentagens são calculadas aqui e o gráfico recebe apenas a
+tabela resultante, cujo tamanho não depende do número de pacientes.
+
+A distribuição da idade (histograma e boxplot) também sai das contagens por
+idade: quartis e cercas são calculados aqui a partir delas.
+
+Para o filtro de idade, cada variável tem uma tabela de somas acumuladas por
+idade (``AgeCountIndex``): as contagens de qualquer faixa saem da diferença
+entre duas linhas, sem filtrar o DataFrame.
+"""
+import copy
+
+import numpy as np
+import pandas as pd
+
+from dashboard.data import TARGET, derived_cache
+
+# Acima desse número de valores distintos a variável é tratada como contínua.
+MAX_DISCRETE_VALUES = 10
+NBINS = 20
+
+DIAGNOSIS_CLASSES = [0, 1]
+
+
+def feature_codes(series, nbins=NBINS):
+    """
+    Converte a coluna em códigos inteiros ``0..k-1`` e retorna
+    ``(códigos, valor de cada código, limites das faixas)``. Variáveis
+    contínuas são divididas em ``nbins`` faixas de mesma largura,
+    representadas pelo ponto médio; nas discretas os limites são ``None``.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), series.cat.categories.to_numpy(), None
+
+    values = series.to_numpy()
+    uniques = np.sort(pd.unique(values))
+    if len(uniques) <= MAX_DISCRETE_VALUES:
+        return np.searchsorted(uniques, values), uniques, None
+
+    edges = np.linspace(values.min(), values.max(), nbins + 1)
+    codes = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, nbins - 1)
+    return codes, (edges[:-1] + edges[1:]) / 2, edges
+
+
+def encode_like(series, values, edges):
+    """
+    Códigos de ``series`` usando os valores/faixas já existentes, ou ``None``
+    se algum valor não couber neles.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        return codes if (codes >= 0).all() else None
+
+    data = series.to_numpy()
+    if edges is not None:
+        if data.min() < edges[0] or data.max() > edges[-1]:
+            return None
+        return np.clip(np.searchsorted(edges, data, side='right') - 1, 0, len(values) - 1)
+
+    codes = np.searchsorted(values, data)
+    if (codes >= len(values)).any() or (values[codes] != data).any():
+        return None
+    return codes
+
+
+def count_matrix(codes, diagnosis, n_values):
+    """Matriz ``(n_values, 2)`` com a contagem de cada valor por diagnóstico."""
+    n_classes = len(DIAGNOSIS_CLASSES)
+    flat = codes.astype(np.int64) * n_classes + diagnosis
+    return np.bincount(flat, minlength=n_values * n_classes).reshape(n_values, n_classes)
+
+
+def counts_table(counts, values, feature, labels=None):
+    """
+    Converte a matriz de contagens em tabela longa com as colunas
+    ``feature``, ``Diagnosis``, ``count`` e ``percent`` (por valor da variável).
+    Valores sem nenhum paciente são omitidos, como no histograma.
+    """
+    totals = counts.sum(axis=1)
+    keep = totals > 0
+    counts, values, totals = counts[keep], values[keep], totals[keep]
+
+    if labels is not None:
+        values = np.array([labels.get(v, v) for v in values.tolist()], dtype=object)
+
+    n_classes = len(DIAGNOSIS_CLASSES)
+    return pd.DataFrame({
+        feature: np.repeat(values, n_classes),
+        TARGET: np.tile([str(c) for c in DIAGNOSIS_CLASSES], len(values)),
+        'count': counts.ravel(),
+        'percent': (counts / totals[:, None] * 100).ravel(),
+    })
+
+
+class AgeCountIndex:
+    """
+    Somas acumuladas das contagens ``valor × Diagnosis`` por idade.
+    ``prefix[i]`` guarda as contagens de todas as idades menores que
+    ``min_age + i``.
+    """
+
+    def __init__(self, df, feature):
+        self.feature = feature
+        codes, self.values, self.edges = feature_codes(df[feature])
+        age = df['Age'].to_numpy().astype(np.int64)
+        self.min_age, self.max_age = int(age.min()), int(age.max())
+
+        counts = self._age_counts(age, codes, df[TARGET].to_numpy())
+        self.prefix = np.zeros((len(counts) + 1, *counts.shape[1:]), dtype=np.int64)
+        np.cumsum(counts, axis=0, out=self.prefix[1:])
+
+    def _age_counts(self, age, codes, diagnosis):
+        n_ages = self.max_age - self.min_age + 1
+        n_values = len(self.values)
+        flat_codes = (age - self.min_age) * n_values + codes
+        counts = count_matrix(flat_codes, diagnosis, n_ages * n_values)
+        return counts.reshape(n_ages, n_values, len(DIAGNOSIS_CLASSES))
+
+    def updated(self, tail):
+        """
+        Novo índice incluindo as linhas de ``tail``, ou ``None`` se elas
+        trouxerem idades ou valores fora do índice (é preciso reconstruí-lo).
+        """
+        codes = encode_like(tail[self.feature], self.values, self.edges)
+        age = tail['Age'].to_numpy().astype(np.int64)
+        if codes is None or age.min() < self.min_age or age.max() > self.max_age:
+            return None
+        index = copy.copy(self)
+        index.prefix = self.prefix.copy()
+        index.prefix[1:] += np.cumsum(self._age_counts(age, codes, tail[TARGET].to_numpy()), axis=0)
+        return index
+
+    def counts(self, age_range=None):
+        """Matriz ``(valores, 2)`` de contagens na faixa de idade, inclusiva."""
+        n_ages = len(self.prefix) - 1
+        if age_range is None:
+            return self.prefix[-1]
+        lo = int(np.clip(np.ceil(age_range[0]) - self.min_age, 0, n_ages))
+        hi = int(np.clip(np.floor(age_range[1]) - self.min_age + 1, lo, n_ages))
+        return self.prefix[hi] - self.prefix[lo]
+
+
+def age_index(df, feature):
+    """Índice de ``feature`` para ``df``, compartilhado entre sessões e atualizado com linhas novas."""
+    return derived_cache(
+        df,
+        ('age_index', feature),
+        lambda data: AgeCountIndex(data, feature),
+        lambda index, data, tail: index.updated(tail)
+    )
+
+
+def crosstab(df, feature, age_range=None, labels=None):
+    """
+    Contagens e porcentagens de ``feature × Diagnosis``, opcionalmente
+    restritas à faixa de idade ``(mínimo, máximo)``, inclusiva.
+    """
+    index = age_index(df, feature)
+    return counts_table(index.counts(age_range), index.values, feature, labels)
+
+
+def age_counts(df):
+    """``(idades, contagens (idades, 2))`` com o número de pacientes de cada idade por diagnóstico."""
+    age = df['Age'].to_numpy().astype(np.int64)
+    min_age = int(age.min())
+    counts = count_matrix(age - min_age, df[TARGET].to_numpy(), int(age.max()) - min_age + 1)
+    return np.arange(min_age, min_age + len(counts)), counts
+
+
+def weighted_quantiles(values, weights, quantiles):
+    """
+    Quantis de ``values`` (ordenados) repetidos ``weights`` vezes, com a
+    mesma interpolação linear de ``np.quantile`` sobre os dados expandidos.
+    """
+    keep = weights > 0
+    values, cumulative = values[keep], np.cumsum(weights[keep])
+    position = np.asarray(quantiles) * (cumulative[-1] - 1)
+    lower = values[np.searchsorted(cumulative, np.floor(position), side='right')]
+    upper = values[np.searchsorted(cumulative, np.ceil(position), side='right')]
+    return lower + (upper - lower) * (position - np.floor(position))
+
+
+def box_stats(values, weights):
+    """
+    Estatísticas do boxplot (quartis e cercas a 1,5 IQR, limitadas ao menor e
+    maior valor dentro delas) de ``values`` com ``weights`` ocorrências cada.
+    """
+    q1, median, q3 = weighted_quantiles(values, weights, [0.25, 0.5, 0.75])
+    present = values[weights > 0]
+    iqr = q3 - q1
+    inside = present[(present >= q1 - 1.5 * iqr) & (present <= q3 + 1.5 * iqr)]
+    return {
+        'q1': q1, 'median': median, 'q3': q3,
+        'lowerfence': inside.min(), 'upperfence': inside.max(),
+        'mean': np.average(values, weights=weights),
+    }
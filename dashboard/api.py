@@ -0,0 +1,258 @@
+"""
+Serviço HTTP de classificação, sem a interface do Streamlit.
+
+Usa o mesmo artefato salvo por ``dashboard.model``. Requisições concorrentes
+são agrupadas em micro-lotes e classificadas com uma única chamada de
+``predict_proba``.
+
+    python -m dashboard.api [--host 127.0.0.1] [--port 8000] [--model caminho.joblib] [--compact]
+
+Com ``--compact`` a Random Forest é servida pela representação de
+``dashboard.compact_forest``, com as mesmas predições e menor latência.
+
+Endpoints:
+
+- ``POST /predict``: um paciente (objeto JSON com as variáveis do modelo);
+- ``POST /predict/batch``: lista de pacientes (``{"records": [...]}``);
+- ``GET /metrics``: percentis de latência por endpoint;
+- ``GET /health``: informações do modelo carregado.
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from dashboard.compact_forest import CompactForest, export_compact
+from dashboard.data import DATA_PATH, source_fingerprint
+from dashboard.model import artifact_path, latest_artifact_path, load_artifact
+from dashboard.scoring import predict_batch
+
+
+class MicroBatcher:
+    """
+    Junta as linhas enviadas por várias threads e as classifica em lote.
+    Um lote é fechado ao atingir ``max_batch`` linhas ou após ``max_wait``
+    segundos desde a primeira requisição.
+    """
+
+    def __init__(self, model, features, max_batch=1024, max_wait=0.002):
+        self.model = model
+        self.features = features
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, rows):
+        """Agenda ``rows`` (array 2D) e retorna um Future com ``(rótulos, probabilidades)``."""
+        future = Future()
+        self._queue.put((rows, future))
+        return future
+
+    def _collect(self):
+        pending = [self._queue.get()]
+        size = len(pending[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            pending.append(item)
+            size += len(item[0])
+        return pending
+
+    def _predict(self, rows):
+        return predict_batch(self.model, pd.DataFrame(rows, columns=self.features))
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            try:
+                labels, proba = self._predict(np.concatenate([rows for rows, _ in pending]))
+            except Exception:
+                # Uma requisição com problema não pode derrubar as outras do lote:
+                # cada uma é classificada sozinha e só a que falhar recebe o erro.
+                for rows, future in pending:
+                    try:
+                        future.set_result(self._predict(rows))
+                    except Exception as e:
+                        future.set_exception(e)
+                continue
+            start = 0
+            for rows, future in pending:
+                end = start + len(rows)
+                future.set_result((labels[start:end], proba[start:end]))
+                start = end
+
+
+class LatencyTracker:
+    """Guarda as últimas latências (ms) de cada endpoint e calcula percentis."""
+
+    def __init__(self, window=10_000):
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, ms):
+        with self._lock:
+            self._samples[endpoint].append(ms)
+
+    def summary(self):
+        with self._lock:
+            samples = {endpoint: np.array(values) for endpoint, values in self._samples.items()}
+        return {
+            endpoint: {
+                'count': len(values),
+                'p50_ms': float(np.percentile(values, 50)),
+                'p90_ms': float(np.percentile(values, 90)),
+                'p99_ms': float(np.percentile(values, 99)),
+                'max_ms': float(values.max()),
+            }
+            for endpoint, values in samples.items() if len(values)
+        }
+
+
+class ScoringService:
+    """Converte registros JSON em linhas do modelo e monta as respostas."""
+
+    def __init__(self, artifact, max_batch=1024, max_wait=0.002):
+        self.artifact = artifact
+        self.features = artifact['features']
+        self.model = artifact['model']
+        self.positive = list(self.model.classes_).index(1)
+        self.batcher = MicroBatcher(self.model, self.features, max_batch, max_wait)
+        self.latency = LatencyTracker()
+
+    def _rows(self, records):
+        if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+            raise ValueError("Os registros devem ser objetos JSON.")
+        missing = sorted({col for r in records for col in self.features if col not in r})
+        if missing:
+            raise ValueError(f"Colunas ausentes: {', '.join(missing)}")
+        try:
+            rows = np.array(
+                [[r[col] for col in self.features] for r in records], dtype=np.float32
+            ).reshape(len(records), len(self.features))
+        except (TypeError, ValueError):
+            raise ValueError("Todas as variáveis devem ser numéricas.")
+        # ``null`` vira NaN: é recusado aqui, antes de entrar em um lote com outras requisições.
+        invalid = [col for col, ok in zip(self.features, np.isfinite(rows).all(axis=0)) if not ok]
+        if invalid:
+            raise ValueError(f"Valores ausentes ou não finitos em: {', '.join(invalid)}")
+        return rows
+
+    def predict(self, records):
+        rows = self._rows(records)
+        if not len(rows):
+            return []
+        labels, proba = self.batcher.submit(rows).result()
+        return [
+            {'prediction': int(label), 'probability': float(p[self.positive])}
+            for label, p in zip(labels, proba)
+        ]
+
+    def health(self):
+        return {
+            'status': 'ok',
+            'fingerprint': self.artifact.get('fingerprint'),
+            'trained_at': self.artifact.get('trained_at'),
+            'features': self.features,
+        }
+
+
+class ScoringServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send(self, status, body):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send(200, service.health())
+            elif self.path == '/metrics':
+                self._send(200, service.latency.summary())
+            else:
+                self._send(404, {'error': 'Endpoint não encontrado.'})
+
+        def do_POST(self):
+            start = time.perf_counter()
+            if self.path not in ('/predict', '/predict/batch'):
+                self._send(404, {'error': 'Endpoint não encontrado.'})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'null')
+                if self.path == '/predict':
+                    self._send(200, service.predict([body])[0])
+                else:
+                    records = body.get('records') if isinstance(body, dict) else body
+                    if not isinstance(records, list):
+                        raise ValueError('O corpo deve ser {"records": [...]} ou uma lista de registros.')
+                    self._send(200, {'predictions': service.predict(records)})
+            except (ValueError, AttributeError) as e:
+                self._send(400, {'error': str(e)})
+            service.latency.record(self.path, (time.perf_counter() - start) * 1000)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def resolve_artifact_path(csv_path=DATA_PATH):
+    """Artefato da versão atual do dataset ou, se ainda não existir, o mais recente."""
+    path = artifact_path(source_fingerprint(csv_path))
+    return path if path.exists() else latest_artifact_path()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serviço HTTP de classificação de diagnóstico.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--model', help="Caminho do artefato (.joblib). Padrão: modelo do dataset atual.")
+    parser.add_argument('--compact', action='store_true', help="Serve a floresta compacta em vez do estimador do scikit-learn.")
+    parser.add_argument('--max-batch', type=int, default=1024, help="Máximo de linhas por micro-lote.")
+    parser.add_argument('--max-wait-ms', type=float, default=2.0, help="Espera máxima para completar um micro-lote.")
+    args = parser.parse_args(argv)
+
+    path = args.model or resolve_artifact_path()
+    if path is None:
+        parser.error("Nenhum modelo treinado. Execute 'python -m dashboard.model' antes.")
+
+    artifact = load_artifact(path)
+    if args.compact:
+        artifact = {**artifact, 'model': CompactForest.load(export_compact(path))}
+    service = ScoringService(artifact, args.max_batch, args.max_wait_ms / 1000)
+    server = ScoringServer((args.host, args.port), make_handler(service))
+    print(f"Modelo: {path}")
+    print(f"Servindo em http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
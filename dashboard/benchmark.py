@@ -0,0 +1,340 @@
+"""
+Benchmark dos caminhos críticos do dashboard com coortes sintéticas.
+
+Para cada tamanho é gerado um CSV com o mesmo esquema de
+``alzheimers_disease_data.csv`` (linhas reamostradas do dataset original,
+com ruído nas variáveis contínuas) e cada etapa é medida separadamente:
+leitura do CSV e do cache, correlação, filtro de idade, construção dos
+gráficos, treino e predição. O resultado é salvo em JSON para comparar
+versões do código:
+
+    python -m dashboard.benchmark [--sizes 10000 100000 1000000] [--output arquivo.json]
+                                  [--baseline anterior.json]
+
+Os tempos são a mediana de ``--repeat`` execuções; o pico de memória
+(``peak_mb``) vem de uma execução extra com ``tracemalloc`` e cobre as
+alocações do Python e do NumPy. O treino é executado uma única vez, com no
+máximo ``--train-rows`` linhas e sem medição de memória; ``max_rss_mb`` traz
+o pico do processo inteiro.
+
+Com ``--startup`` o relatório também traz o pré-aquecimento do dataset real
+(``dashboard.prewarm``) e o tempo de inicialização de cada página em um
+processo novo, com os módulos pesados que ela carregou.
+"""
+import argparse
+import json
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dashboard.aggregates import age_index, crosstab
+from dashboard.charts import age_box, age_histogram, diagnosis_count_bar, large_scatter
+from dashboard.compact_forest import CompactForest
+from dashboard.correlation import CorrelationAccumulator, numeric_columns, spearman_correlation
+from dashboard.cube import CountCube, cohort_mask
+from dashboard.data import (
+    CACHE_DIR, DATA_PATH, FLOAT_COLUMNS, ROOT_DIR, as_numeric, read_csv, read_dataset,
+)
+from dashboard.model import train_classification_model
+from dashboard.profiling import max_rss_mb
+from dashboard.scoring import predict_batch
+from dashboard.search import STRATEGIES
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+BENCHMARK_DIR = CACHE_DIR / 'benchmarks'
+
+# Faixa de idade usada no filtro, como se o usuário tivesse movido o slider.
+AGE_RANGE = (65, 80)
+COHORT = {'Gender': [1], 'Hypertension': [1], 'EducationLevel': [1, 2], 'Age': AGE_RANGE}
+
+
+def synthetic_cohort(n_rows, source=DATA_PATH, seed=42):
+    """
+    Coorte sintética com as mesmas colunas do CSV original: linhas reamostradas
+    com reposição e ruído gaussiano (5% do desvio) nas colunas contínuas.
+    """
+    rng = np.random.default_rng(seed)
+    base = pd.read_csv(source)
+    df = base.iloc[rng.integers(0, len(base), n_rows)].reset_index(drop=True)
+    for col in FLOAT_COLUMNS:
+        noise = rng.normal(0, 0.05 * base[col].std(), n_rows)
+        df[col] = (df[col] + noise).clip(base[col].min(), base[col].max())
+    df['PatientID'] = np.arange(n_rows) + base['PatientID'].max() + 1
+    return df
+
+
+def write_cohort(n_rows, directory, seed=42):
+    """Grava a coorte em ``directory`` (reaproveitando um arquivo já gerado)."""
+    path = Path(directory) / f'synthetic_{n_rows}.csv'
+    if not path.exists():
+        tmp_path = path.with_suffix('.tmp')
+        synthetic_cohort(n_rows, seed=seed).to_csv(tmp_path, index=False)
+        tmp_path.replace(path)
+    return path
+
+
+def _clear_dataset_cache(csv_path):
+    """Remove os arquivos de ``.cache/`` gerados para o CSV (dados, metadados, lock)."""
+    stem = Path(csv_path).stem
+    for path in [*CACHE_DIR.glob(f'{stem}.*'), *CACHE_DIR.glob(f'locks/{stem}.*')]:
+        if path.is_dir():
+            shutil.rmtree(path)
+        else:
+            path.unlink(missing_ok=True)
+
+
+def _measure(fn, repeat=3, setup=None):
+    """
+    Executa ``fn`` uma vez sob ``tracemalloc`` (pico de memória) e depois
+    ``repeat`` vezes sem ele (mediana do tempo). Retorna ``(resultado, medidas)``.
+    """
+    if setup:
+        setup()
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return result, {'seconds': float(np.median(samples)), 'peak_mb': peak / 1e6}
+
+
+def _latency(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {'p50_ms': float(np.percentile(samples, 50)), 'p99_ms': float(np.percentile(samples, 99))}
+
+
+def _figure_stage(build, repeat):
+    fig, stats = _measure(build, repeat)
+    start = time.perf_counter()
+    payload = fig.to_json()
+    stats['json_seconds'] = time.perf_counter() - start
+    stats['json_bytes'] = len(payload.encode())
+    return stats
+
+
+def benchmark_size(csv_path, repeat=3, train_rows=10_000, strategy='warm_start', latency_repeat=100):
+    """Mede todas as etapas para um CSV e retorna um dicionário por etapa."""
+    stages = {}
+
+    # Carga: parse do CSV, primeira leitura (gera o cache Feather) e leituras seguintes.
+    _, stages['csv_parse'] = _measure(lambda: read_csv(csv_path), repeat)
+    _, stages['dataset_cold'] = _measure(
+        lambda: read_dataset(csv_path), repeat, setup=lambda: _clear_dataset_cache(csv_path)
+    )
+    df, stages['dataset_warm'] = _measure(lambda: read_dataset(csv_path), repeat)
+
+    # Home: correlação completa do pandas (como antes) e pelo acumulador incremental.
+    columns = numeric_columns(df)
+    _, stages['corr_pandas'] = _measure(lambda: as_numeric(df, columns).corr(), repeat)
+
+    def accumulator_corr():
+        acc = CorrelationAccumulator(columns)
+        acc.update(df)
+        return acc.correlation()
+
+    _, stages['corr_accumulator'] = _measure(accumulator_corr, repeat)
+    _, stages['corr_spearman'] = _measure(lambda: spearman_correlation(df), repeat)
+
+    # Páginas 2 e 3: filtro de idade direto, tabela cruzada (com o índice) e só a consulta.
+    _, stages['age_filter_mask'] = _measure(lambda: df[df['Age'].between(*AGE_RANGE)], repeat)
+    _, stages['age_crosstab'] = _measure(lambda: crosstab(df, 'Gender', AGE_RANGE), repeat)
+    index = age_index(df, 'Gender')
+    _, stages['age_index_counts'] = _measure(lambda: index.counts(AGE_RANGE), repeat)
+
+    # Coortes: construção do cubo e um recorte com vários filtros, contra a máscara equivalente.
+    cube, stages['cube_build'] = _measure(lambda: CountCube(df), repeat)
+    _, stages['cohort_filter_mask'] = _measure(lambda: df[cohort_mask(df, COHORT)], repeat)
+    _, stages['cohort_cube_counts'] = _measure(lambda: cube.counts_by('Ethnicity', COHORT), repeat)
+
+    # Construção dos gráficos e tamanho do JSON enviado ao navegador.
+    stages['figure_age_histogram'] = _figure_stage(lambda: age_histogram(df), repeat)
+    stages['figure_age_box'] = _figure_stage(lambda: age_box(df), repeat)
+    table = crosstab(df, 'Gender', AGE_RANGE)
+    stages['figure_gender_bar'] = _figure_stage(
+        lambda: diagnosis_count_bar(table, x='Gender', title='Gênero'), repeat
+    )
+    stages['figure_mmse_scatter'] = _figure_stage(
+        lambda: large_scatter(df, x='Age', y='MMSE', color='Diagnosis')[0], repeat
+    )
+
+    # Treino com uma amostra limitada, executado uma vez e sem tracemalloc,
+    # que deixaria a busca várias vezes mais lenta.
+    train_df = df.sample(n=min(train_rows, len(df)), random_state=42)
+    start = time.perf_counter()
+    artifact = train_classification_model(train_df, strategy=strategy)
+    stages['train'] = dict(
+        seconds=time.perf_counter() - start,
+        rows=len(train_df),
+        strategy=strategy,
+        accuracy=artifact['metrics']['accuracy'],
+        search_seconds=artifact['search']['wall_seconds'],
+    )
+
+    # Predição: uma linha (latência) e o dataset inteiro em lote.
+    model, features = artifact['model'], artifact['features']
+    X = as_numeric(df, features)
+    row = X.iloc[:1]
+    stages['predict_single'] = _latency(lambda: predict_batch(model, row), latency_repeat)
+    _, stages['predict_batch'] = _measure(lambda: predict_batch(model, X), repeat)
+    stages['predict_batch']['rows'] = len(X)
+
+    if hasattr(model, 'estimators_'):
+        compact = CompactForest.from_sklearn(model)
+        stages['predict_single_compact'] = _latency(lambda: predict_batch(compact, row), latency_repeat)
+        _, stages['predict_batch_compact'] = _measure(lambda: predict_batch(compact, X), repeat)
+
+    return stages
+
+
+def _git_commit():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f'{commit}-dirty' if dirty else commit
+
+
+def _environment():
+    import plotly
+    import sklearn
+
+    return {
+        'commit': _git_commit(),
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'packages': {
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'scikit-learn': sklearn.__version__,
+            'plotly': plotly.__version__,
+        },
+    }
+
+
+def run(sizes=DEFAULT_SIZES, data_dir=None, **options):
+    """Executa o benchmark para cada tamanho e retorna o relatório completo."""
+    report = {'environment': _environment(), 'options': options, 'runs': []}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        directory = Path(data_dir or tmp_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        for n_rows in sizes:
+            print(f"{n_rows} linhas: gerando coorte...", flush=True)
+            csv_path = write_cohort(n_rows, directory)
+            try:
+                stages = benchmark_size(csv_path, **options)
+            finally:
+                _clear_dataset_cache(csv_path)
+            report['runs'].append({
+                'rows': n_rows,
+                'csv_bytes': csv_path.stat().st_size,
+                # Pico do processo inteiro até aqui.
+                'max_rss_mb': max_rss_mb(),
+                'stages': stages,
+            })
+            print(summary(report['runs'][-1:]).to_string(), flush=True)
+    return report
+
+
+def summary(runs):
+    """Tabela etapa × tamanho com o tempo principal de cada etapa (s ou ms de latência)."""
+    data = {}
+    for entry in runs:
+        data[entry['rows']] = {
+            stage: stats.get('seconds', stats.get('p50_ms'))
+            for stage, stats in entry['stages'].items()
+        }
+    return pd.DataFrame(data)
+
+
+def compare(baseline, report):
+    """Razão entre os tempos do relatório atual e de um relatório anterior (>1 = mais lento)."""
+    old, new = summary(baseline['runs']), summary(report['runs'])
+    sizes = [size for size in new.columns if size in old.columns]
+    return (new[sizes] / old[sizes]).dropna(how='all')
+
+
+def compare_startup(baseline, report):
+    """Razão entre os tempos de inicialização de cada página (>1 = mais lento), se os dois relatórios os tiverem."""
+    if 'startup' not in baseline or 'startup' not in report:
+        return pd.Series(dtype=float)
+    old, new = baseline['startup']['pages'], report['startup']['pages']
+    return pd.Series({
+        page: new[page]['seconds'] / old[page]['seconds'] for page in new if page in old
+    }, dtype=float)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark das etapas do dashboard com coortes sintéticas.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Número de linhas de cada coorte.")
+    parser.add_argument('--repeat', type=int, default=3, help="Repetições de cada etapa (mediana).")
+    parser.add_argument('--train-rows', type=int, default=10_000, help="Máximo de linhas usadas no treino.")
+    parser.add_argument('--strategy', choices=list(STRATEGIES), default='warm_start', help="Estratégia de busca no treino.")
+    parser.add_argument('--data-dir', help="Pasta para guardar e reaproveitar os CSVs gerados.")
+    parser.add_argument('--output', help="Arquivo JSON de saída. Padrão: .cache/benchmarks/<commit>.json")
+    parser.add_argument('--baseline', help="Relatório anterior para comparar os tempos.")
+    parser.add_argument('--startup', action='store_true', help="Mede também o pré-aquecimento e a inicialização das páginas.")
+    args = parser.parse_args(argv)
+
+    report = run(
+        args.sizes, args.data_dir,
+        repeat=args.repeat, train_rows=args.train_rows, strategy=args.strategy,
+    )
+    if args.startup:
+        from dashboard.prewarm import page_startups, prewarm
+
+        print("Pré-aquecimento e inicialização das páginas...", flush=True)
+        report['startup'] = {'prewarm': prewarm(), 'pages': page_startups()}
+        for page, stats in report['startup']['pages'].items():
+            print(f"{page}: {stats['seconds']:.2f}s, módulos pesados: {', '.join(stats['heavy_modules']) or '-'}")
+
+    output = Path(args.output) if args.output else BENCHMARK_DIR / f"{report['environment']['commit'] or 'benchmark'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Relatório: {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        ratios = compare(baseline, report)
+        if ratios.empty:
+            print(f"Nenhum tamanho em comum com {args.baseline}.")
+        else:
+            print(f"Comparação com {args.baseline} (atual / anterior):")
+            print(ratios.to_string(float_format=lambda v: f'{v:.2f}'))
+        startup = compare_startup(baseline, report)
+        if not startup.empty:
+            print("Inicialização das páginas (atual / anterior):")
+            print(startup.to_string(float_format=lambda v: f'{v:.2f}'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+"""
+Armazenamento dos caches (dataset convertido, modelos, acumuladores)
+compartilhado entre processos.
+
+``st.cache_data``/``st.cache_resource`` valem só dentro de um processo. Com
+várias réplicas do Streamlit atrás de um balanceador, cada uma refaria a
+leitura do CSV e o treino. Com um backend compartilhado, a primeira réplica
+faz o trabalho segurando um lock de arquivo; as demais esperam o lock e
+depois apenas mapeiam em memória (mmap) o resultado já gravado.
+
+Backends, escolhidos por ``DASHBOARD_CACHE_BACKEND``:
+
+- ``disk`` (padrão): diretório ``.cache/`` do projeto, ou
+  ``DASHBOARD_CACHE_DIR``; serve para réplicas na mesma máquina ou com um
+  volume compartilhado;
+- ``shm``: ``/dev/shm/streamlit-dashboard`` (tmpfs), os arquivos ficam em
+  RAM e o mmap das réplicas aponta para as mesmas páginas.
+
+Verificação com vários processos locais disputando o mesmo cache vazio:
+
+    python -m dashboard.cache_backend [--processes 4] [--model]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from multiprocessing import get_context
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SHM_DIR = Path('/dev/shm') / 'streamlit-dashboard'
+
+
+@contextmanager
+def file_lock(path):
+    """Lock exclusivo entre processos (e entre threads) sobre ``path``."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a+') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class CacheBackend:
+    """
+    Onde os arquivos de cache ficam e como o trabalho é coordenado entre
+    processos. Os arquivos devem ser gravados de forma atômica (arquivo
+    temporário + ``os.replace``), para que leitores nunca vejam um arquivo
+    pela metade.
+    """
+
+    name = None
+    root = None  # diretório onde os arquivos são materializados (para mmap)
+
+    def path(self, name):
+        """Caminho do arquivo ``name`` dentro do cache."""
+        raise NotImplementedError
+
+    def lock(self, name):
+        """Context manager que garante que só um processo trabalha em ``name`` por vez."""
+        raise NotImplementedError
+
+    def get_or_build(self, name, build, is_valid=None):
+        """
+        Caminho de ``name``, chamando ``build(caminho)`` se ele ainda não existir
+        (ou ``is_valid(caminho)`` for falso). Só um processo constrói; os demais
+        esperam o lock e reaproveitam o arquivo.
+        """
+        path = self.path(name)
+
+        def ready():
+            return path.exists() and (is_valid is None or is_valid(path))
+
+        if not ready():
+            with self.lock(name):
+                # Outra réplica pode ter construído enquanto esperávamos o lock.
+                if not ready():
+                    build(path)
+        return path
+
+
+class LocalDiskBackend(CacheBackend):
+    """Arquivos e locks em um diretório local (ou volume compartilhado)."""
+
+    name = 'disk'
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def path(self, name):
+        return self.root / name
+
+    def lock(self, name):
+        return file_lock(self.root / 'locks' / f'{name}.lock')
+
+
+class SharedMemoryBackend(LocalDiskBackend):
+    """Como ``LocalDiskBackend``, mas em ``/dev/shm``: os arquivos ficam só em RAM."""
+
+    name = 'shm'
+
+    def __init__(self, root=SHM_DIR):
+        if not root.parent.is_dir():
+            raise RuntimeError(f"{root.parent} não existe; use o backend 'disk'.")
+        super().__init__(root)
+
+
+BACKENDS = {backend.name: backend for backend in (LocalDiskBackend, SharedMemoryBackend)}
+
+
+def make_backend(name=None, root=None):
+    """Backend ``name`` (ou de ``DASHBOARD_CACHE_BACKEND``) com raiz ``root`` (ou ``DASHBOARD_CACHE_DIR``)."""
+    name = name or os.environ.get('DASHBOARD_CACHE_BACKEND', 'disk')
+    root = root or os.environ.get('DASHBOARD_CACHE_DIR')
+    if name not in BACKENDS:
+        raise ValueError(f"Backend de cache desconhecido: {name!r} (opções: {', '.join(BACKENDS)})")
+    if root is None:
+        return BACKENDS[name]() if name == 'shm' else LocalDiskBackend(ROOT_DIR / '.cache')
+    return BACKENDS[name](Path(root))
+
+
+_backend = None
+
+
+def get_backend():
+    """Backend configurado para o processo."""
+    global _backend
+    if _backend is None:
+        _backend = make_backend()
+    return _backend
+
+
+def _load_worker(csv_path, barrier, model, strategy):
+    from dashboard.data import read_dataset_with_meta
+    from dashboard.model import build_artifact, load_artifact
+
+    barrier.wait()
+    start = time.perf_counter()
+    df, meta = read_dataset_with_meta(csv_path)
+    result = {'pid': os.getpid(), 'rows': len(df), 'data_built_by': meta.get('built_by'),
+              'data_seconds': time.perf_counter() - start}
+    if model:
+        start = time.perf_counter()
+        artifact = load_artifact(build_artifact(csv_path, strategy=strategy))
+        result.update(model_built_by=artifact.get('built_by'), model_seconds=time.perf_counter() - start)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vários processos disputando um cache vazio: só um deve construir.")
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--csv', default=str(ROOT_DIR / 'alzheimers_disease_data.csv'))
+    parser.add_argument('--model', action='store_true', help="Também treina o modelo (demorado).")
+    parser.add_argument('--strategy', default='warm_start', help="Estratégia de busca usada com --model.")
+    args = parser.parse_args(argv)
+    from dashboard.data import file_sha256
+    from dashboard.model import artifact_path
+
+    # Cópia do CSV com nome próprio, para começar com o cache vazio sem apagar o do dataset real.
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = Path(tmp_dir) / f'cache_check_{os.getpid()}.csv'
+        shutil.copyfile(args.csv, csv_path)
+        # Uma linha em branco muda o fingerprint (e o artefato do modelo) sem mudar os dados.
+        with open(csv_path, 'ab') as f:
+            f.write(b'\n')
+
+        ctx = get_context('spawn')
+        barrier = ctx.Manager().Barrier(args.processes)
+        with ctx.Pool(args.processes) as pool:
+            results = pool.starmap(
+                _load_worker, [(str(csv_path), barrier, args.model, args.strategy)] * args.processes
+            )
+
+        backend = get_backend()
+        model_path = artifact_path(file_sha256(csv_path))
+        leftovers = [
+            *backend.root.glob(f'{csv_path.stem}.*'),
+            *backend.root.glob(f'locks/{csv_path.stem}.*'),
+            model_path,
+            backend.root / 'locks' / 'models' / f'{model_path.name}.lock',
+        ]
+        for path in leftovers:
+            if path.is_dir():
+                shutil.rmtree(path)
+            else:
+                path.unlink(missing_ok=True)
+
+    print(f"Backend: {backend.name} ({backend.root})")
+    for result in results:
+        print(result)
+    for key in ('data_built_by', 'model_built_by'):
+        builders = {r[key] for r in results if key in r}
+        if builders:
+            ok = len(builders) == 1 and builders <= {r['pid'] for r in results}
+            print(f"{key}: {'OK' if ok else 'FALHOU'}, construído por {builders}")
+
+
+if __name__ == '__main__':
+    main()
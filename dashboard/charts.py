@@ -0,0 +1,270 @@
+"""
+Gráficos do dashboard: barras a partir de ``dashboard.aggregates`` e dispersão para grandes volumes.
+
+O ``plotly.express`` é importado dentro de cada função: com a figura já no
+cache (``dashboard.figure_cache``) a página não precisa carregá-lo.
+"""
+import numpy as np
+
+from dashboard.aggregates import age_counts, box_stats, counts_table
+from dashboard.data import TARGET
+
+DIAGNOSIS_ORDER = {TARGET: ['0', '1']}
+AGE_BINS = 20
+
+
+def age_box(df):
+    """
+    Distribuição da idade por diagnóstico (usado na Home e na Análise
+    Demográfica). Os quartis são calculados a partir das contagens por idade,
+    então a figura não carrega as linhas dos pacientes.
+    """
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    ages, counts = age_counts(df)
+    fig = go.Figure()
+    for i, diagnosis in enumerate(DIAGNOSIS_ORDER[TARGET]):
+        if counts[:, i].sum() == 0:
+            continue
+        stats = box_stats(ages, counts[:, i])
+        fig.add_trace(go.Box(
+            name=diagnosis, x=[diagnosis], legendgroup=diagnosis,
+            marker_color=px.colors.qualitative.Plotly[i],
+            **{key: [float(value)] for key, value in stats.items()}
+        ))
+    fig.update_layout(
+        title='Distribuição da Idade por Diagnóstico',
+        xaxis_title='Diagnóstico', yaxis_title='Idade', legend_title_text='Diagnóstico'
+    )
+    return fig
+
+
+def age_histogram(df, nbins=AGE_BINS):
+    """
+    Histograma da idade por diagnóstico (usado na Home e na Análise
+    Demográfica), em até ``nbins`` faixas de anos inteiros contadas no servidor.
+    """
+    import plotly.express as px
+
+    ages, counts = age_counts(df)
+    width = -(-len(ages) // nbins)
+    starts = np.arange(0, len(ages), width)
+    counts = np.add.reduceat(counts, starts, axis=0)
+    table = counts_table(counts, ages[starts] + (width - 1) / 2, 'Age')
+    fig = px.bar(
+        table,
+        x='Age',
+        y='count',
+        color=TARGET,
+        title='Distribuição da Idade por Diagnóstico',
+        labels={'Age': 'Idade', 'count': 'Contagem'},
+        category_orders=DIAGNOSIS_ORDER
+    )
+    fig.update_traces(width=width)
+    fig.update_layout(bargap=0)
+    return fig
+
+
+def correlation_heatmap(corr_matrix):
+    """Mapa de calor da matriz de correlação (Home)."""
+    import plotly.express as px
+
+    fig = px.imshow(
+        corr_matrix,
+        text_auto=True,
+        aspect="auto",
+        labels=dict(color="Correlação"),
+        color_continuous_scale=px.colors.sequential.Viridis
+    )
+    fig.update_layout(title='Matriz de Correlação das Variáveis Numéricas')
+    return fig
+
+
+def diagnosis_pie(df):
+    """Proporção de cada diagnóstico (Home)."""
+    import plotly.express as px
+
+    diagnosis_counts = df['Diagnosis'].value_counts().reset_index()
+    diagnosis_counts.columns = ['Diagnosis', 'Count']
+    fig = px.pie(
+        diagnosis_counts,
+        names='Diagnosis',
+        values='Count',
+        title='Proporção de Diagnósticos',
+        hole=0.3,
+        labels={'Diagnosis': 'Diagnóstico', 'Count': 'Número de Pacientes'}
+    )
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    return fig
+
+
+def probability_bar(probabilities, class_names):
+    """Probabilidade prevista de cada classe para um paciente (Predição)."""
+    import plotly.express as px
+
+    fig = px.bar(
+        x=[f"{p:.1%}" for p in probabilities],
+        y=class_names,
+        orientation='h',
+        labels={'x': 'Probabilidade', 'y': 'Diagnóstico'},
+        title='Probabilidade de Cada Classe',
+        text=[f"{p:.1%}" for p in probabilities]
+    )
+    fig.update_traces(marker_color=['green', 'red'])
+    return fig
+
+
+def confusion_matrix_heatmap(matrix, class_names):
+    """Matriz de confusão do modelo no conjunto de teste (Predição)."""
+    import plotly.express as px
+
+    return px.imshow(
+        matrix, text_auto=True,
+        labels=dict(x="Predição", y="Verdadeiro"),
+        x=class_names, y=class_names,
+        color_continuous_scale='Blues'
+    )
+
+
+def importance_bar(feature_importances, top=15):
+    """As ``top`` variáveis mais importantes do modelo (Predição)."""
+    import plotly.express as px
+
+    fig = px.bar(feature_importances.head(top),
+                 x='importance', y='feature', orientation='h',
+                 title=f'Top {top} Variáveis Mais Importantes')
+    fig.update_layout(yaxis={'categoryorder': 'total ascending'})
+    return fig
+
+
+def diagnosis_count_bar(table, x, title, labels=None, category_orders=None):
+    """Barras agrupadas com a contagem de cada diagnóstico por valor de ``x``."""
+    import plotly.express as px
+
+    return px.bar(
+        table,
+        x=x,
+        y='count',
+        color=TARGET,
+        barmode='group',
+        title=title,
+        labels=labels,
+        category_orders={**DIAGNOSIS_ORDER, **(category_orders or {})}
+    )
+
+
+def diagnosis_percent_bar(table, x, title, labels=None, category_orders=None):
+    """Barras empilhadas com a proporção (%) de cada diagnóstico por valor de ``x``."""
+    import plotly.express as px
+
+    return px.bar(
+        table,
+        x=x,
+        y='percent',
+        color=TARGET,
+        text_auto='.2f',
+        title=title,
+        labels=labels,
+        category_orders={**DIAGNOSIS_ORDER, **(category_orders or {})}
+    )
+
+
+def cohort_rate_bar(table, x, title, labels=None):
+    """Barras lado a lado com a taxa de Alzheimer (%) de cada coorte por valor de ``x``."""
+    import plotly.express as px
+
+    return px.bar(
+        table,
+        x=x,
+        y='rate',
+        color='cohort',
+        barmode='group',
+        text_auto='.1f',
+        hover_data=['patients'],
+        title=title,
+        labels=labels,
+    )
+
+
+# Acima de WEBGL_THRESHOLD pontos o scatter usa WebGL; acima de
+# DOWNSAMPLE_THRESHOLD é reduzido a MAX_SCATTER_POINTS (ou vira densidade),
+# a não ser que a resolução completa seja pedida.
+WEBGL_THRESHOLD = 5_000
+DOWNSAMPLE_THRESHOLD = 50_000
+MAX_SCATTER_POINTS = 20_000
+DENSITY_BINS = 60
+
+
+def stratified_sample(df, by, n, seed=42):
+    """Amostra ``n`` linhas mantendo a proporção de cada valor de ``by``."""
+    if len(df) <= n:
+        return df
+    rng = np.random.default_rng(seed)
+    groups = df.groupby(by, observed=True).indices
+    selected = [
+        rng.choice(rows, size=max(1, round(len(rows) * n / len(df))), replace=False)
+        for rows in groups.values()
+    ]
+    return df.take(np.sort(np.concatenate(selected)))
+
+
+def density_heatmap(df, x, y, color, labels=None, title=None, nbins=DENSITY_BINS):
+    """Histograma 2D calculado no servidor, um painel por valor de ``color``."""
+    import plotly.express as px
+
+    xs, ys = df[x].to_numpy(), df[y].to_numpy()
+    x_edges = np.linspace(xs.min(), xs.max(), nbins + 1)
+    y_edges = np.linspace(ys.min(), ys.max(), nbins + 1)
+    classes = np.sort(df[color].unique())
+    colors = df[color].to_numpy()
+    grids = np.stack([
+        np.histogram2d(ys[colors == c], xs[colors == c], bins=(y_edges, x_edges))[0]
+        for c in classes
+    ])
+    labels = labels or {}
+    fig = px.imshow(
+        grids,
+        facet_col=0,
+        x=(x_edges[:-1] + x_edges[1:]) / 2,
+        y=(y_edges[:-1] + y_edges[1:]) / 2,
+        origin='lower',
+        aspect='auto',
+        labels={'x': labels.get(x, x), 'y': labels.get(y, y), 'color': 'Pacientes'},
+        title=title
+    )
+    for annotation, c in zip(fig.layout.annotations, classes):
+        annotation.text = f"{labels.get(color, color)} = {c}"
+    return fig
+
+
+def large_scatter(df, x, y, color, hover_data=None, labels=None, title=None, mode='sample', full_resolution=False):
+    """
+    ``px.scatter`` adaptado ao tamanho dos dados. Retorna
+    ``(figura, pontos exibidos, total de pontos)``; os dois números também
+    ficam em ``layout.meta`` para quem só tiver a figura serializada.
+    ``mode`` é ``'sample'`` (amostra estratificada por ``color``) ou
+    ``'density'`` (histograma 2D).
+    """
+    import plotly.express as px
+
+    total = len(df)
+    if total > DOWNSAMPLE_THRESHOLD and not full_resolution:
+        if mode == 'density':
+            fig = density_heatmap(df, x, y, color, labels, title)
+            fig.update_layout(meta={'shown': 0, 'total': total})
+            return fig, 0, total
+        df = stratified_sample(df[[x, y, color, *(hover_data or [])]], color, MAX_SCATTER_POINTS)
+
+    fig = px.scatter(
+        df,
+        x=x,
+        y=y,
+        color=color,
+        hover_data=hover_data,
+        labels=labels,
+        title=title,
+        render_mode='webgl' if len(df) > WEBGL_THRESHOLD else 'svg'
+    )
+    fig.update_layout(meta={'shown': len(df), 'total': total})
+    return fig, len(df), total
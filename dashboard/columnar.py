@@ -0,0 +1,128 @@
+"""
+Armazenamento colunar mapeado em memória, para datasets maiores que a RAM.
+
+Cada coluna fica em um arquivo binário próprio (``<coluna>.bin``) e as
+categóricas guardam apenas os códigos. O esquema e o número de linhas ficam
+em ``columns.json``. A gravação aceita o dataset em blocos, então o CSV
+nunca precisa estar inteiro em memória, e linhas novas são acrescentadas ao
+fim de cada arquivo. A leitura mapeia os arquivos com ``np.memmap``: o
+DataFrame resultante aponta direto para o disco (somente leitura) e só as
+páginas das colunas e linhas realmente usadas (a página da tabela, as colunas
+de um gráfico) são carregadas.
+"""
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SCHEMA_FILE = 'columns.json'
+
+
+def _column_schema(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes
+        return {'name': series.name, 'dtype': codes.dtype.str, 'categories': series.cat.categories.tolist()}
+    return {'name': series.name, 'dtype': series.dtype.str}
+
+
+def _column_values(series):
+    values = series.cat.codes if isinstance(series.dtype, pd.CategoricalDtype) else series
+    return np.ascontiguousarray(values.to_numpy())
+
+
+class ColumnStore:
+    """Diretório com um arquivo por coluna, mapeado em memória na leitura."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        with open(self.directory / SCHEMA_FILE) as f:
+            schema = json.load(f)
+        self.rows = schema['rows']
+        self.columns = {col['name']: col for col in schema['columns']}
+
+    @classmethod
+    def create(cls, directory, chunks):
+        """
+        Grava os DataFrames de ``chunks`` (mesmas colunas e tipos) em
+        ``directory``. A gravação é feita em um diretório temporário, que
+        substitui o anterior só no final.
+        """
+        directory = Path(directory)
+        tmp_dir = directory.with_name(f'{directory.name}.{os.getpid()}.tmp')
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+
+        schema, files, rows = None, {}, 0
+        try:
+            for chunk in chunks:
+                if schema is None:
+                    schema = [_column_schema(chunk[col]) for col in chunk.columns]
+                    files = {col: open(tmp_dir / f'{col}.bin', 'wb') for col in chunk.columns}
+                for col, f in files.items():
+                    f.write(_column_values(chunk[col]).tobytes())
+                rows += len(chunk)
+        finally:
+            for f in files.values():
+                f.close()
+        if schema is None:
+            raise ValueError("Nenhum bloco de dados para gravar.")
+        cls._write_schema(tmp_dir, schema, rows)
+
+        if directory.exists():
+            # Quem já mapeou os arquivos antigos continua lendo-os normalmente.
+            old_dir = directory.with_name(f'{directory.name}.{os.getpid()}.old')
+            directory.rename(old_dir)
+            shutil.rmtree(old_dir, ignore_errors=True)
+        tmp_dir.rename(directory)
+        return cls(directory)
+
+    @staticmethod
+    def _write_schema(directory, columns, rows):
+        tmp_path = directory / f'{SCHEMA_FILE}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'rows': rows, 'columns': columns}, f)
+        os.replace(tmp_path, directory / SCHEMA_FILE)
+
+    def append(self, df, at_row=None):
+        """
+        Grava as linhas de ``df`` a partir da linha ``at_row`` (padrão: o fim),
+        descartando o que houver depois dela. Retorna o store atualizado.
+        """
+        at_row = self.rows if at_row is None else at_row
+        for col, schema in self.columns.items():
+            values = _column_values(df[col]).astype(schema['dtype'], copy=False)
+            with open(self.directory / f'{col}.bin', 'r+b') as f:
+                f.seek(at_row * values.itemsize)
+                f.write(values.tobytes())
+                f.truncate()
+        # O número de linhas só muda depois que todas as colunas foram gravadas.
+        self._write_schema(self.directory, list(self.columns.values()), at_row + len(df))
+        return ColumnStore(self.directory)
+
+    def column(self, name):
+        """Array somente leitura da coluna, mapeado do disco."""
+        schema = self.columns[name]
+        dtype = np.dtype(schema['dtype'])
+        if self.rows == 0:
+            return np.empty(0, dtype=dtype)
+        values = np.memmap(self.directory / f'{name}.bin', dtype=dtype, mode='r', shape=(self.rows,))
+        # Visão ``ndarray`` comum (ainda sobre o mapeamento), para o pandas não propagar a subclasse.
+        return values.view(np.ndarray)
+
+    def read(self):
+        """
+        DataFrame sem cópias sobre os arquivos mapeados. Recortes de linhas e
+        colunas (``df.iloc``, ``df[colunas]``) continuam apontando para o
+        mapeamento, então só as páginas usadas são lidas do disco.
+        """
+        data = {}
+        for name, schema in self.columns.items():
+            values = self.column(name)
+            categories = schema.get('categories')
+            if categories is not None:
+                values = pd.Categorical.from_codes(values, dtype=pd.CategoricalDtype(categories))
+            data[name] = values
+        return pd.DataFrame(data, index=pd.RangeIndex(self.rows), copy=False)
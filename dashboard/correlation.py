@@ -0,0 +1,219 @@
+"""
+Matriz de correlação incremental.
+
+``CorrelationAccumulator`` guarda apenas o número de linhas, as somas e as
+somas de produtos cruzados das colunas. Novas linhas são somadas ao
+acumulador e a matriz de Pearson é obtida em O(k²), independente do número
+de pacientes. O acumulador é salvo ao lado do cache do dataset, com o
+fingerprint da versão do CSV que acumulou, e, quando linhas são anexadas ao
+CSV, recebe apenas as linhas novas.
+"""
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from dashboard.data import (
+    CACHE_DIR, DATA_PATH, as_numeric, dataset_version, derived_cache, extends_fingerprint, source_fingerprint,
+)
+
+# Linhas convertidas para float64 por vez, para a memória não crescer com o dataset.
+ROW_BLOCK = 100_000
+
+
+class CorrelationAccumulator:
+    """
+    Estatísticas suficientes para covariância e correlação de Pearson.
+    Os valores são deslocados pela média do primeiro lote (``shift``) para
+    reduzir o erro numérico das somas de produtos. ``fingerprint`` e
+    ``segments`` identificam a versão do CSV cujas linhas foram acumuladas.
+    """
+
+    def __init__(self, columns):
+        k = len(columns)
+        self.columns = list(columns)
+        self.n = 0
+        self.shift = np.zeros(k)
+        self.sums = np.zeros(k)
+        self.cross = np.zeros((k, k))
+        self.fingerprint = None
+        self.segments = []
+
+    def _blocks(self, df):
+        for start in range(0, len(df), ROW_BLOCK):
+            yield as_numeric(df.iloc[start:start + ROW_BLOCK], self.columns).to_numpy(dtype=np.float64)
+
+    def update(self, df):
+        """Acrescenta as linhas de ``df`` ao acumulador, em blocos de ``ROW_BLOCK``."""
+        for X in self._blocks(df):
+            if self.n == 0:
+                self.shift = X.mean(axis=0)
+            X = X - self.shift
+            self.n += len(X)
+            self.sums += X.sum(axis=0)
+            self.cross += X.T @ X
+        return self
+
+    def updated(self, df):
+        """Cópia do acumulador com as linhas de ``df`` somadas."""
+        acc = CorrelationAccumulator(self.columns)
+        acc.n, acc.shift, acc.sums, acc.cross = self.n, self.shift, self.sums.copy(), self.cross.copy()
+        acc.fingerprint, acc.segments = self.fingerprint, list(self.segments)
+        return acc.update(df)
+
+    def covariance(self):
+        mean = self.sums / self.n
+        return (self.cross - self.n * np.outer(mean, mean)) / (self.n - 1)
+
+    def correlation(self, columns=None):
+        """Matriz de Pearson (opcionalmente só de ``columns``) como DataFrame."""
+        cov = self.covariance()
+        std = np.sqrt(np.diag(cov))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = cov / np.outer(std, std)
+        result = pd.DataFrame(corr, index=self.columns, columns=self.columns)
+        if columns is not None:
+            result = result.loc[columns, columns]
+        return result
+
+    def save(self, path):
+        path = Path(path)
+        tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f, columns=np.array(self.columns), n=self.n, shift=self.shift, sums=self.sums, cross=self.cross,
+                fingerprint=self.fingerprint, segments=np.array(self.segments, dtype=np.int64),
+            )
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            acc = cls(data['columns'].tolist())
+            acc.n = int(data['n'])
+            acc.shift, acc.sums, acc.cross = data['shift'], data['sums'], data['cross']
+            acc.fingerprint, acc.segments = str(data['fingerprint']), data['segments'].tolist()
+        return acc
+
+
+def numeric_columns(df):
+    return as_numeric(df.iloc[:0]).select_dtypes('number').columns.tolist()
+
+
+def accumulator_path(csv_path=DATA_PATH):
+    return CACHE_DIR / f'{Path(csv_path).stem}.corr.npz'
+
+
+def build_accumulator(df, csv_path=DATA_PATH, meta=None):
+    """
+    Carrega o acumulador salvo e soma apenas as linhas novas de ``df``. A
+    versão do CSV vem de ``meta`` (metadados do cache) ou de ``df.attrs``; se
+    a versão salva não for um prefixo dela (ver ``extends_fingerprint``), o
+    acumulador é refeito. Sem fingerprint, nada é lido nem salvo em disco.
+    """
+    columns = numeric_columns(df)
+    if meta is not None:
+        fingerprint, segments = meta['sha256'], meta['segments']
+    else:
+        fingerprint, segments = df.attrs.get('fingerprint'), df.attrs.get('segments')
+    if fingerprint is None or segments is None:
+        return CorrelationAccumulator(columns).update(df)
+
+    path = accumulator_path(csv_path)
+    acc = None
+    if path.exists():
+        try:
+            acc = CorrelationAccumulator.load(path)
+        except (OSError, ValueError, KeyError):
+            acc = None
+    if (
+        acc is None or acc.columns != columns or acc.n > len(df)
+        or not extends_fingerprint(csv_path, acc.segments, acc.fingerprint, segments, fingerprint)
+    ):
+        acc = CorrelationAccumulator(columns)
+
+    if acc.fingerprint != fingerprint:
+        acc.update(df.iloc[acc.n:])
+        acc.fingerprint, acc.segments = fingerprint, list(segments)
+        save_accumulator(acc, csv_path)
+    return acc
+
+
+def _append_accumulator(acc, df, tail, csv_path):
+    """Acumulador com as linhas ``tail`` anexadas, já com o fingerprint de ``df``."""
+    acc = acc.updated(tail)
+    acc.fingerprint, acc.segments = df.attrs['fingerprint'], list(df.attrs['segments'])
+    return save_accumulator(acc, csv_path)
+
+
+def save_accumulator(acc, csv_path=DATA_PATH):
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        acc.save(accumulator_path(csv_path))
+    except OSError:
+        pass
+    return acc
+
+
+def spearman_correlation(df, columns=None):
+    """Correlação de Spearman (postos); não é incremental, calcular uma vez por versão."""
+    data = as_numeric(df, columns or numeric_columns(df))
+    return data.rank().corr()
+
+
+def spearman_path(csv_path=DATA_PATH):
+    return CACHE_DIR / f'{Path(csv_path).stem}.spearman.npz'
+
+
+def build_spearman(df, csv_path=DATA_PATH, fingerprint=None):
+    """
+    Matriz de Spearman de todas as colunas numéricas. Fica salva em disco com
+    o fingerprint do CSV, então outros processos (e o pré-aquecimento, ver
+    ``dashboard.prewarm``) a reaproveitam enquanto o CSV não mudar.
+    """
+    path = spearman_path(csv_path)
+    fingerprint = fingerprint or df.attrs.get('fingerprint') or source_fingerprint(csv_path)
+    try:
+        with np.load(path) as data:
+            if str(data['fingerprint']) == fingerprint:
+                columns = data['columns'].tolist()
+                return pd.DataFrame(data['corr'], index=columns, columns=columns)
+    except (OSError, ValueError, KeyError):
+        pass
+
+    corr = spearman_correlation(df)
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, fingerprint=fingerprint, columns=np.array(corr.columns), corr=corr.to_numpy())
+        tmp_path.replace(path)
+    except OSError:
+        pass
+    return corr
+
+
+@st.cache_resource(max_entries=2)
+def _cached_spearman(_df, version):
+    return build_spearman(_df, _df.attrs.get('source', DATA_PATH))
+
+
+def correlation_matrix(df, method='pearson', columns=None):
+    """Matriz de correlação de ``df``, compartilhada entre sessões por versão do dataset."""
+    version = dataset_version(df)
+    if method == 'spearman':
+        if version is None:
+            return spearman_correlation(df, columns)
+        # A matriz de um subconjunto de colunas é a submatriz da completa.
+        corr = _cached_spearman(df, version)
+        return corr.loc[columns, columns] if columns else corr
+    csv_path = df.attrs.get('source', DATA_PATH)
+    acc = derived_cache(
+        df,
+        'correlation',
+        lambda data: build_accumulator(data, csv_path),
+        lambda acc, data, tail: _append_accumulator(acc, data, tail, csv_path)
+    )
+    return acc.correlation(columns)
@@ -0,0 +1,211 @@
+"""
+Cubo de contagens para recortar e comparar coortes.
+
+``CountCube`` guarda em um único array denso do NumPy o número de pacientes
+de cada combinação de gênero, etnia, escolaridade, comorbidades
+(``COMORBIDITY_COLUMNS``), idade (em anos) e Diagnosis. Qualquer recorte
+dessas variáveis sai de reduções do array, sem percorrer o DataFrame: o
+custo depende do tamanho do cubo (cerca de 64 mil células), não do número de
+pacientes.
+
+Uma coorte é um dicionário ``{coluna: valores aceitos}``; a idade entra como
+``'Age': (mínimo, máximo)``, inclusiva. Colunas ausentes não filtram.
+"""
+import copy
+
+import numpy as np
+import pandas as pd
+
+from dashboard.aggregates import DIAGNOSIS_CLASSES, count_matrix, counts_table, crosstab, feature_codes
+from dashboard.data import CATEGORICAL_COLUMNS, TARGET, derived_cache
+
+BLOCK_ROWS = 100_000
+
+COMORBIDITY_COLUMNS = ['CardiovascularDisease', 'Diabetes', 'Depression', 'HeadInjury', 'Hypertension']
+CUBE_COLUMNS = [*CATEGORICAL_COLUMNS, *COMORBIDITY_COLUMNS]
+CUBE_VALUES = {**CATEGORICAL_COLUMNS, **{col: [0, 1] for col in COMORBIDITY_COLUMNS}}
+
+LABELS = {
+    'Gender': {0: "Homem", 1: "Mulher"},
+    'Ethnicity': {0: "Caucasian", 1: "African American", 2: "Asian", 3: "Other"},
+    'EducationLevel': {0: "Nenhum", 1: "Ensino médio", 2: "Bacharelado", 3: "Pós"},
+    **{col: {0: "Não", 1: "Sim"} for col in COMORBIDITY_COLUMNS},
+}
+TITLES = {
+    'Gender': "Gênero",
+    'Ethnicity': "Etnia",
+    'EducationLevel': "Escolaridade",
+    'CardiovascularDisease': "Doença cardiovascular",
+    'Diabetes': "Diabetes",
+    'Depression': "Depressão",
+    'HeadInjury': "Lesão na cabeça",
+    'Hypertension': "Hipertensão",
+    'Age': "Idade",
+}
+
+
+class CountCube:
+    """Contagens de pacientes por ``CUBE_COLUMNS × idade × Diagnosis``."""
+
+    def __init__(self, df):
+        age = df['Age'].to_numpy()
+        self.values = {col: np.asarray(CUBE_VALUES[col]) for col in CUBE_COLUMNS}
+        self.values['Age'] = np.arange(int(age.min()), int(age.max()) + 1)
+        self.dimensions = list(self.values)
+        self.shape = (*(len(v) for v in self.values.values()), len(DIAGNOSIS_CLASSES))
+
+        self.counts = np.zeros(self.shape, dtype=np.int64)
+        # Em blocos, para os códigos intermediários não crescerem com o dataset.
+        for start in range(0, len(df), BLOCK_ROWS):
+            self.counts += self._block_counts(df.iloc[start:start + BLOCK_ROWS])
+
+    def _flat_index(self, df):
+        """Posição de cada linha no cubo achatado, ou ``None`` se alguma cair fora dele."""
+        codes = []
+        for col in CUBE_COLUMNS:
+            series = df[col]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                codes.append(series.cat.codes.to_numpy().astype(np.intp))
+            else:
+                codes.append(np.searchsorted(self.values[col], series.to_numpy()))
+        codes.append(df['Age'].to_numpy().astype(np.intp) - self.values['Age'][0])
+        codes.append(df[TARGET].to_numpy().astype(np.intp))
+        try:
+            flat = np.ravel_multi_index(codes, self.shape)
+        except ValueError:
+            return None
+        # ``searchsorted`` não detecta valores que não estão na lista, só os maiores que ela.
+        for col, code in zip(CUBE_COLUMNS, codes):
+            if not isinstance(df[col].dtype, pd.CategoricalDtype) and (self.values[col][code] != df[col].to_numpy()).any():
+                return None
+        return flat
+
+    def _block_counts(self, df):
+        flat = self._flat_index(df)
+        if flat is None:
+            raise ValueError("Há valores fora das categorias esperadas nas colunas do cubo.")
+        return np.bincount(flat, minlength=self.counts.size).reshape(self.shape)
+
+    def updated(self, tail):
+        """Novo cubo incluindo as linhas de ``tail``, ou ``None`` se alguma cair fora dele."""
+        try:
+            counts = self._block_counts(tail)
+        except ValueError:
+            return None
+        cube = copy.copy(self)
+        cube.counts = self.counts + counts
+        return cube
+
+    def _positions(self, col, selection):
+        values = self.values[col]
+        if col == 'Age':
+            lo, hi = selection
+            return np.flatnonzero((values >= lo) & (values <= hi))
+        return np.flatnonzero(np.isin(values, list(selection)))
+
+    def select(self, cohort=None):
+        """Cubo restrito à coorte (mesmas dimensões, menos valores em cada uma)."""
+        counts = self.counts
+        for axis, col in enumerate(self.dimensions):
+            if cohort and col in cohort:
+                counts = counts.take(self._positions(col, cohort[col]), axis=axis)
+        return counts
+
+    def totals(self, cohort=None):
+        """Contagens ``(2,)`` de cada diagnóstico na coorte."""
+        counts = self.select(cohort)
+        return counts.reshape(-1, counts.shape[-1]).sum(axis=0)
+
+    def counts_by(self, feature, cohort=None, age_band=1):
+        """
+        Retorna ``(contagens (valores, 2), valores)`` de ``feature`` na coorte.
+        Para ``Age``, ``age_band`` agrupa as idades em faixas desse número de anos.
+        """
+        counts = self.select(cohort)
+        axis = self.dimensions.index(feature)
+        others = tuple(i for i in range(counts.ndim - 1) if i != axis)
+        counts = counts.sum(axis=others)
+        values = self.values[feature]
+        if cohort and feature in cohort:
+            values = values[self._positions(feature, cohort[feature])]
+        if feature == 'Age' and age_band > 1 and len(values):
+            # Faixas alinhadas à menor idade do cubo, iguais para qualquer coorte.
+            band = (values - self.values['Age'][0]) // age_band
+            starts = np.flatnonzero(np.r_[True, np.diff(band) != 0])
+            counts = np.add.reduceat(counts, starts, axis=0)
+            lows = band[starts] * age_band + self.values['Age'][0]
+            values = np.array([f"{low}–{low + age_band - 1}" for low in lows.tolist()], dtype=object)
+        return counts, values
+
+
+def count_cube(df):
+    """Cubo de ``df``, compartilhado entre sessões e atualizado com linhas novas."""
+    return derived_cache(df, 'count_cube', CountCube, lambda cube, data, tail: cube.updated(tail))
+
+
+def cohort_key(cohort):
+    """Representação imutável da coorte, para chaves de cache."""
+    return tuple(sorted((col, tuple(values)) for col, values in (cohort or {}).items()))
+
+
+def cohort_mask(df, cohort):
+    """Máscara das linhas de ``df`` na coorte (percorre o DataFrame)."""
+    mask = np.ones(len(df), dtype=bool)
+    for col, selection in (cohort or {}).items():
+        values = df[col].to_numpy()
+        if col == 'Age':
+            mask &= (values >= selection[0]) & (values <= selection[1])
+        else:
+            mask &= np.isin(values, list(selection))
+    return mask
+
+
+def cohort_crosstab(df, feature, cohort=None, labels=None):
+    """
+    Como ``aggregates.crosstab``, restrito à coorte. Variáveis do cubo saem
+    dele; as demais usam o índice por idade ou, com outros filtros, uma
+    máscara sobre o DataFrame.
+    """
+    if feature in CUBE_COLUMNS:
+        counts, values = count_cube(df).counts_by(feature, cohort)
+        return counts_table(counts, values, feature, labels)
+    if not cohort or set(cohort) == {'Age'}:
+        return crosstab(df, feature, (cohort or {}).get('Age'), labels)
+    mask = cohort_mask(df, cohort)
+    codes, values, _ = feature_codes(df[feature])
+    counts = count_matrix(codes[mask], df[TARGET].to_numpy()[mask], len(values))
+    return counts_table(counts, values, feature, labels)
+
+
+def cohort_rates(cube, cohorts, feature, age_band=1, labels=None):
+    """
+    Tabela longa com pacientes, casos e taxa de Alzheimer (%) de cada coorte
+    de ``cohorts`` (``{nome: coorte}``) por valor de ``feature``.
+    """
+    tables = []
+    for name, cohort in cohorts.items():
+        counts, values = cube.counts_by(feature, cohort, age_band)
+        patients = counts.sum(axis=1)
+        if labels is not None:
+            values = np.array([labels.get(v, v) for v in values.tolist()], dtype=object)
+        tables.append(pd.DataFrame({
+            feature: values,
+            'cohort': name,
+            'patients': patients,
+            'alzheimer': counts[:, 1],
+            'rate': np.where(patients > 0, counts[:, 1] / np.maximum(patients, 1) * 100, np.nan),
+        }))
+    return pd.concat(tables, ignore_index=True)
+
+
+def cohort_filters(container, key):
+    """Seletores de uma coorte em ``container`` (nenhum valor marcado = todos)."""
+    cohort = {}
+    for col in CUBE_COLUMNS:
+        selected = container.pills(
+            TITLES[col], list(LABELS[col]), format_func=LABELS[col].get,
+            selection_mode='multi', key=f'{key}_{col}',
+        )
+        if selected:
+            cohort[col] = selected
+    return cohort
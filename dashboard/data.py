@@ -0,0 +1,615 @@
+"""
+Camada de dados compartilhada pelas páginas do dashboard.
+
+O CSV é convertido uma única vez para um arquivo Feather (Arrow IPC) com
+tipos compactos; as execuções seguintes mapeiam esse arquivo em memória
+enquanto o CSV não mudar. Com ``DASHBOARD_STORAGE=columns`` o cache é um
+arquivo por coluna (``dashboard.columnar``), gerado lendo o CSV em blocos,
+para datasets maiores que a RAM. O cache fica no backend de cache
+(``dashboard.cache_backend``), então réplicas do dashboard compartilham a
+conversão: só uma lê o CSV e as demais apenas mapeiam o resultado. Dentro
+do processo o DataFrame é mantido por um ``DatasetStore``, então todas as
+sessões compartilham a mesma cópia; linhas anexadas ao CSV são
+incorporadas sem reiniciar o processo. Só linhas completas (terminadas em
+quebra de linha) são lidas, então um CSV sendo escrito nunca é lido pela
+metade. Na anexação o formato 'columns' grava só as linhas novas, enquanto o
+arquivo Feather é regravado inteiro.
+"""
+import hashlib
+import io
+import json
+import os
+import threading
+from contextlib import ExitStack
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.feather as feather
+import streamlit as st
+
+from dashboard.cache_backend import get_backend
+from dashboard.columnar import ColumnStore
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DATA_PATH = ROOT_DIR / 'alzheimers_disease_data.csv'
+CACHE_DIR = get_backend().root
+
+# Incrementar quando os tipos abaixo ou o formato do cache mudarem, para invalidar caches antigos.
+SCHEMA_VERSION = 3
+
+# Formato do cache: 'feather' (um arquivo Arrow IPC) ou 'columns' (um arquivo
+# por coluna, convertido em blocos sem carregar o CSV inteiro).
+STORAGE = os.environ.get('DASHBOARD_STORAGE', 'feather')
+CSV_CHUNK_ROWS = 200_000
+
+# Bytes finais comparados para decidir se o CSV apenas recebeu novas linhas.
+TAIL_CHECK_BYTES = 64 * 1024
+
+DROP_COLUMNS = ["PatientID", "DoctorInCharge"]
+TARGET = 'Diagnosis'
+
+CATEGORICAL_COLUMNS = {
+    'Gender': [0, 1],
+    'Ethnicity': [0, 1, 2, 3],
+    'EducationLevel': [0, 1, 2, 3],
+}
+
+BINARY_COLUMNS = [
+    'Smoking', 'FamilyHistoryAlzheimers', 'CardiovascularDisease', 'Diabetes',
+    'Depression', 'HeadInjury', 'Hypertension', 'MemoryComplaints',
+    'BehavioralProblems', 'Confusion', 'Disorientation', 'PersonalityChanges',
+    'DifficultyCompletingTasks', 'Forgetfulness', 'Diagnosis',
+]
+
+INTEGER_COLUMNS = {'Age': 'int8', 'SystolicBP': 'int16', 'DiastolicBP': 'int16'}
+
+FLOAT_COLUMNS = [
+    'BMI', 'AlcoholConsumption', 'PhysicalActivity', 'DietQuality', 'SleepQuality',
+    'CholesterolTotal', 'CholesterolLDL', 'CholesterolHDL', 'CholesterolTriglycerides',
+    'MMSE', 'FunctionalAssessment', 'ADL',
+]
+
+DTYPES = {
+    **{col: pd.CategoricalDtype(categories) for col, categories in CATEGORICAL_COLUMNS.items()},
+    **{col: 'int8' for col in BINARY_COLUMNS},
+    **INTEGER_COLUMNS,
+    **{col: 'float32' for col in FLOAT_COLUMNS},
+}
+
+
+def file_sha256(path, start=0, end=None, chunk_size=1 << 20):
+    """Calcula o SHA-256 dos bytes ``[start, end)`` do arquivo (padrão: inteiro) lendo em blocos."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        f.seek(start)
+        left = float('inf') if end is None else end - start
+        while left > 0:
+            chunk = f.read(int(min(chunk_size, left)))
+            if not chunk:
+                break
+            digest.update(chunk)
+            left -= len(chunk)
+    return digest.hexdigest()
+
+
+def _chain_sha256(previous, digest):
+    return hashlib.sha256(f'{previous}{digest}'.encode()).hexdigest()
+
+
+def segments_sha256(path, segments):
+    """
+    Fingerprint do CSV lido em trechos que terminam nas posições de
+    ``segments``: o SHA-256 do primeiro trecho encadeado com o de cada trecho
+    anexado depois. Com um único trecho é o SHA-256 do arquivo.
+    """
+    sha256, start = None, 0
+    for end in segments:
+        digest = file_sha256(path, start, end)
+        sha256 = digest if sha256 is None else _chain_sha256(sha256, digest)
+        start = end
+    return sha256
+
+
+def extends_fingerprint(path, prefix_segments, prefix_sha256, segments, sha256):
+    """
+    Indica se a versão do CSV com fingerprint ``prefix_sha256`` (lida em
+    ``prefix_segments``) é um prefixo da versão com ``sha256``: os trechos
+    coincidem e encadear o fingerprint antigo com os trechos seguintes dá o
+    atual. Só os bytes anexados depois do prefixo são lidos.
+    """
+    k = len(prefix_segments)
+    if k == 0 or list(segments[:k]) != list(prefix_segments):
+        return False
+    start = prefix_segments[-1]
+    for end in segments[k:]:
+        prefix_sha256 = _chain_sha256(prefix_sha256, file_sha256(path, start, end))
+        start = end
+    return prefix_sha256 == sha256
+
+
+def complete_size(path, size=None):
+    """
+    Posição logo após a última quebra de linha antes de ``size`` (padrão: o
+    tamanho atual). O que vem depois é uma linha ainda sendo escrita e não é lido.
+    """
+    with open(path, 'rb') as f:
+        end = os.fstat(f.fileno()).st_size if size is None else size
+        while end > 0:
+            start = max(0, end - TAIL_CHECK_BYTES)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b'\n')
+            if newline >= 0:
+                return start + newline + 1
+            end = start
+    return 0
+
+
+class _FileRange(io.RawIOBase):
+    """Bytes ``[start, end)`` de um arquivo, como arquivo somente leitura."""
+
+    def __init__(self, path, start, end):
+        self._file = open(path, 'rb')
+        self._file.seek(start)
+        self._left = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._left <= 0:
+            return 0
+        n = self._file.readinto(memoryview(buffer)[:self._left])
+        self._left -= n
+        return n
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def _open_range(path, start=0, end=None):
+    return io.BufferedReader(_FileRange(path, start, complete_size(path) if end is None else end))
+
+
+def _cache_paths(path):
+    stem = Path(path).stem
+    return CACHE_DIR / f'{stem}.{STORAGE}', CACHE_DIR / f'{stem}.meta.json'
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(meta_path, meta):
+    tmp_path = meta_path.with_suffix(f'.{os.getpid()}.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+
+def _tail_sha256(path, size):
+    """
+    Hash dos últimos ``TAIL_CHECK_BYTES`` antes de ``size``, ou ``None`` se
+    o arquivo não terminar em quebra de linha nesse ponto (linha incompleta).
+    """
+    with open(path, 'rb') as f:
+        f.seek(max(0, size - TAIL_CHECK_BYTES))
+        tail = f.read(size - f.tell())
+    if not tail.endswith(b'\n'):
+        return None
+    return hashlib.sha256(tail).hexdigest()
+
+
+def _source_meta(path, stat, size, rows, previous=None):
+    """
+    Metadados do cache para os primeiros ``size`` bytes do CSV (até a última
+    linha completa); ``file_size`` é o tamanho do arquivo visto em ``stat``.
+    Com ``previous``, metadados de um prefixo do arquivo, o fingerprint
+    encadeia o anterior com o hash apenas dos bytes novos.
+    """
+    if previous is None:
+        segments, sha256 = [size], file_sha256(path, 0, size)
+    elif size == previous['size']:
+        segments, sha256 = previous['segments'], previous['sha256']
+    else:
+        segments = [*previous['segments'], size]
+        sha256 = _chain_sha256(previous['sha256'], file_sha256(path, previous['size'], size))
+    return {
+        'schema': SCHEMA_VERSION,
+        'storage': STORAGE,
+        'mtime_ns': stat.st_mtime_ns,
+        'file_size': stat.st_size,
+        'size': size,
+        'sha256': sha256,
+        'segments': segments,
+        'tail_sha256': _tail_sha256(path, size),
+        'rows': rows,
+        'built_by': os.getpid(),
+    }
+
+
+def _is_current(meta, stat):
+    """Se ``meta`` descreve o CSV no estado de ``stat`` (mesmo mtime e tamanho)."""
+    return meta is not None and (meta.get('mtime_ns'), meta.get('file_size')) == (stat.st_mtime_ns, stat.st_size)
+
+
+def _write_cache(path, df, meta):
+    """
+    Grava ``df`` no cache Feather (o formato 'columns' é gravado por
+    ``ColumnStore``). Retorna ``False`` se o cache não puder ser gravado.
+    """
+    data_path, meta_path = _cache_paths(path)
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = data_path.with_suffix(f'.{os.getpid()}.tmp')
+        # Sem compressão e em um único bloco, cada coluna pode ser mapeada direto do arquivo.
+        df.to_feather(tmp_path, compression='uncompressed', chunksize=max(len(df), 1))
+        os.replace(tmp_path, data_path)
+        _write_meta(meta_path, meta)
+    except OSError:
+        # Sem permissão de escrita: segue sem o cache em disco.
+        return False
+    return True
+
+
+def is_append(path, meta, stat):
+    """
+    Indica se o CSV só ganhou linhas no final desde ``meta``: o arquivo
+    cresceu e os bytes finais da versão anterior continuam iguais.
+    """
+    return (
+        meta is not None
+        and stat.st_size > meta.get('size', 0)
+        and meta.get('tail_sha256') is not None
+        and _tail_sha256(path, meta['size']) == meta['tail_sha256']
+    )
+
+
+def source_position(path):
+    """
+    Fim da última linha completa do CSV e hash dos bytes finais, para
+    reconhecer anexações com ``is_append``.
+    """
+    size = complete_size(path)
+    return {'size': size, 'tail_sha256': _tail_sha256(path, size)}
+
+
+def _apply_dtypes(df):
+    return df.astype({col: DTYPES[col] for col in CATEGORICAL_COLUMNS})
+
+
+_CSV_OPTIONS = {
+    'usecols': lambda col: col not in DROP_COLUMNS,
+    'dtype': {col: dtype for col, dtype in DTYPES.items() if col not in CATEGORICAL_COLUMNS},
+}
+
+
+# As leituras abaixo param em ``size`` (padrão: a última linha completa), para
+# nunca interpretar uma linha que outro processo ainda está escrevendo.
+
+def read_csv(path, size=None):
+    """Lê o CSV original já com os tipos compactos, sem passar pelo cache."""
+    with _open_range(path, 0, size) as f:
+        return _apply_dtypes(pd.read_csv(f, **_CSV_OPTIONS))
+
+
+def read_csv_chunks(path, chunk_rows=CSV_CHUNK_ROWS, size=None):
+    """Lê o CSV em blocos de ``chunk_rows`` linhas, já com os tipos compactos."""
+    with _open_range(path, 0, size) as f, pd.read_csv(f, chunksize=chunk_rows, **_CSV_OPTIONS) as reader:
+        for chunk in reader:
+            yield _apply_dtypes(chunk)
+
+
+def read_csv_tail(path, offset, size=None):
+    """Lê apenas as linhas entre os bytes ``offset`` e ``size``."""
+    with open(path, 'rb') as f:
+        header = f.readline().decode().rstrip('\r\n').split(',')
+    with _open_range(path, offset, size) as f:
+        try:
+            df = pd.read_csv(f, header=None, names=header, **_CSV_OPTIONS)
+        except pd.errors.EmptyDataError:
+            return None
+    return _apply_dtypes(df)
+
+
+def source_fingerprint(path=DATA_PATH):
+    """
+    Retorna o fingerprint do CSV (ver ``segments_sha256``), o mesmo de
+    ``df.attrs['fingerprint']``. Vem dos metadados do cache enquanto mtime e
+    tamanho do arquivo não mudarem; senão o cache é atualizado antes.
+    """
+    _, meta_path = _cache_paths(path)
+    meta = _read_meta(meta_path)
+    if _is_current(meta, os.stat(path)):
+        return meta['sha256']
+    return read_dataset_with_meta(path)[1]['sha256']
+
+
+def read_feather(feather_path):
+    """
+    Mapeia o arquivo Feather em memória. As colunas apontam para as páginas do
+    arquivo (somente leitura), compartilhadas com outros processos que mapeiam
+    o mesmo arquivo; substituí-lo com ``os.replace`` não afeta quem já o mapeou.
+    """
+    return feather.read_table(feather_path, memory_map=True).to_pandas(split_blocks=True)
+
+
+def _read_cache(data_path):
+    if STORAGE == 'columns':
+        return ColumnStore(data_path).read()
+    return read_feather(data_path)
+
+
+def _cache_usable(meta, data_path):
+    return meta and meta.get('schema') == SCHEMA_VERSION and meta.get('storage') == STORAGE and data_path.exists()
+
+
+def _read_current(path, data_path, meta_path):
+    """Cache e metadados, se o cache corresponder à versão atual do CSV."""
+    stat = os.stat(path)
+    meta = _read_meta(meta_path)
+    if _cache_usable(meta, data_path) and _is_current(meta, stat):
+        return _read_cache(data_path), meta
+    return None
+
+
+def read_dataset_with_meta(path=DATA_PATH):
+    """
+    ``(DataFrame, metadados do cache)`` da versão atual do CSV. Quando o cache
+    precisa ser atualizado, isso é feito sob o lock do backend: com várias
+    réplicas, só uma lê o CSV e as outras reaproveitam o arquivo gravado.
+    """
+    path = Path(path)
+    data_path, meta_path = _cache_paths(path)
+    result = _read_current(path, data_path, meta_path)
+    if result is not None:
+        return result
+    with ExitStack() as stack:
+        try:
+            stack.enter_context(get_backend().lock(path.stem))
+        except OSError:
+            # Sem acesso de escrita ao cache: segue lendo o CSV direto.
+            return _read_uncached(path)
+        # Outra réplica pode ter atualizado o cache enquanto esperávamos o lock.
+        result = _read_current(path, data_path, meta_path)
+        if result is not None:
+            return result
+        return _rebuild_cache(path, data_path, meta_path)
+
+
+def _read_uncached(path):
+    stat = os.stat(path)
+    size = complete_size(path, stat.st_size)
+    df = read_csv(path, size)
+    return df, _source_meta(path, stat, size, len(df))
+
+
+def _read_appended(path, stat, df, meta):
+    """``(linhas anexadas desde meta, metadados novos)``; as linhas são ``None`` se não houver nenhuma completa."""
+    size = complete_size(path, stat.st_size)
+    tail = read_csv_tail(path, meta['size'], size)
+    return tail, _source_meta(path, stat, size, len(df) + (0 if tail is None else len(tail)), previous=meta)
+
+
+def _append_cache(path, df, tail, meta):
+    """
+    Grava no cache as linhas ``tail`` anexadas a ``df`` e retorna o dataset
+    completo. No formato 'columns' só as linhas novas são escritas; o arquivo
+    Feather não aceita anexação e é regravado inteiro, custo proporcional ao
+    dataset (para CSVs que crescem com frequência, prefira 'columns').
+    """
+    data_path, meta_path = _cache_paths(path)
+    if tail is None:
+        _write_meta(meta_path, meta)
+        return df
+    if STORAGE == 'columns':
+        # Só as linhas novas são escritas, no fim do arquivo de cada coluna.
+        store = ColumnStore(data_path).append(tail, at_row=len(df))
+        _write_meta(meta_path, meta)
+        return store.read()
+    df = pd.concat([df, tail], ignore_index=True)
+    if _write_cache(path, df, meta):
+        # Volta a mapear o arquivo, compartilhado com as outras réplicas, em vez de manter a cópia.
+        return read_feather(data_path)
+    return df
+
+
+def _convert_csv(path, stat):
+    """Converte o CSV inteiro (até a última linha completa) para o cache; no formato 'columns', em blocos."""
+    size = complete_size(path, stat.st_size)
+    if STORAGE == 'columns':
+        data_path, meta_path = _cache_paths(path)
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            store = ColumnStore.create(data_path, read_csv_chunks(path, size=size))
+        except OSError:
+            # Sem permissão de escrita: segue sem o cache em disco.
+            return _read_uncached(path)
+        meta = _source_meta(path, stat, size, store.rows)
+        _write_meta(meta_path, meta)
+        return store.read(), meta
+    df = read_csv(path, size)
+    meta = _source_meta(path, stat, size, len(df))
+    _write_cache(path, df, meta)
+    return df, meta
+
+
+def _rebuild_cache(path, data_path, meta_path):
+    stat = os.stat(path)
+    meta = _read_meta(meta_path)
+
+    if _cache_usable(meta, data_path):
+        if is_append(path, meta, stat):
+            df = _read_cache(data_path)
+            tail, meta = _read_appended(path, stat, df, meta)
+            return _append_cache(path, df, tail, meta), meta
+        # O mtime mudou mas o conteúdo pode ser o mesmo (ex.: checkout, touch).
+        if complete_size(path, stat.st_size) == meta['size'] and segments_sha256(path, meta['segments']) == meta['sha256']:
+            meta.update(mtime_ns=stat.st_mtime_ns, file_size=stat.st_size)
+            _write_meta(meta_path, meta)
+            return _read_cache(data_path), meta
+
+    return _convert_csv(path, stat)
+
+
+def read_dataset(path=DATA_PATH):
+    """
+    Carrega o dataset a partir do cache. Se o CSV só ganhou linhas
+    no final, apenas elas são lidas; se mudou de outra forma (mtime/tamanho
+    e hash diferentes), o cache é reconstruído.
+    """
+    return read_dataset_with_meta(path)[0]
+
+
+def as_numeric(df, columns=None):
+    """
+    ``columns`` de ``df`` (padrão: todas) com as categóricas trocadas por seus
+    códigos numéricos, para correlação e modelo. As demais colunas não são
+    copiadas.
+    """
+    data = {}
+    for col in columns if columns is not None else df.columns:
+        series = df[col]
+        # As categorias são 0..k-1, então o código é o próprio valor.
+        data[col] = series.cat.codes if isinstance(series.dtype, pd.CategoricalDtype) else series
+    return pd.DataFrame(data, index=df.index, copy=False)
+
+
+def dataset_version(df):
+    """Identificador da versão do dataset, usado como chave dos caches derivados."""
+    return df.attrs.get('version')
+
+
+class DatasetStore:
+    """
+    Versão atual do dataset em memória e os caches derivados dela.
+
+    A cada acesso o CSV é verificado com ``os.stat``. Se só ganhou linhas no
+    final, apenas elas são lidas e anexadas, e cada cache derivado registrado
+    com uma função ``update`` é atualizado com as linhas novas em vez de ser
+    recalculado. Qualquer outra mudança recarrega tudo.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.df = None
+        self.meta = None
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    def _changed(self, stat):
+        return not _is_current(self.meta, stat)
+
+    def current(self):
+        """DataFrame da versão atual do CSV."""
+        if self._changed(os.stat(self.path)):
+            with self._lock:
+                stat = os.stat(self.path)
+                if self._changed(stat):
+                    if self.df is not None and is_append(self.path, self.meta, stat):
+                        self._append(stat)
+                    else:
+                        self._publish(*read_dataset_with_meta(self.path), derived={})
+        return self.df
+
+    def _append(self, stat):
+        tail, meta = _read_appended(self.path, stat, self.df, self.meta)
+        data_path, meta_path = _cache_paths(self.path)
+        with ExitStack() as stack:
+            try:
+                stack.enter_context(get_backend().lock(self.path.stem))
+            except OSError:
+                # Sem acesso de escrita ao cache: as linhas novas ficam só em memória.
+                df = self.df if tail is None else pd.concat([self.df, tail], ignore_index=True)
+            else:
+                current = _read_meta(meta_path)
+                if _cache_usable(current, data_path) and _is_current(current, stat):
+                    # Outra réplica já gravou o cache com as mesmas linhas.
+                    df = _read_cache(data_path)
+                else:
+                    df = _append_cache(self.path, self.df, tail, meta)
+
+        # Os atributos vão antes dos ``update``, que podem usar o fingerprint novo.
+        df = self._stamp(df.copy(deep=False), meta)
+        derived = {}
+        for key, (_, value, update) in self._derived.items():
+            if update is not None and tail is not None:
+                value = update(value, df, tail)
+            if value is not None:
+                derived[key] = (df.attrs['version'], value, update)
+        self._derived = derived
+        self.df, self.meta = df, meta
+
+    @staticmethod
+    def _version(meta):
+        return f"{meta['mtime_ns']}-{meta['size']}"
+
+    def _stamp(self, df, meta):
+        df.attrs['version'] = self._version(meta)
+        df.attrs['source'] = str(self.path)
+        df.attrs['fingerprint'] = meta['sha256']
+        df.attrs['segments'] = list(meta['segments'])
+        return df
+
+    def _publish(self, df, meta, derived):
+        self._derived = derived
+        self.df, self.meta = self._stamp(df, meta), meta
+
+    def derived(self, df, key, build, update=None):
+        """
+        Valor ``build(df)`` guardado para a versão atual. Quando linhas são
+        anexadas, ``update(valor, df_novo, linhas_novas)`` produz o novo valor
+        (ou ``None`` para recalcular depois). Os valores não devem ser
+        alterados in-place, pois sessões com a versão anterior ainda os usam.
+        """
+        version = dataset_version(df)
+        entry = self._derived.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        value = build(df)
+        # Sob o lock: ``_append`` percorre ``_derived`` enquanto aplica linhas novas.
+        with self._lock:
+            if df is self.df:
+                self._derived[key] = (version, value, update)
+        return value
+
+
+@st.cache_resource
+def _get_store(path):
+    return DatasetStore(path)
+
+
+def derived_cache(df, key, build, update=None):
+    """
+    Cache de um valor derivado de ``df``, compartilhado entre sessões e
+    atualizado incrementalmente (ver ``DatasetStore.derived``). Para
+    DataFrames que não vieram de ``load_data`` apenas chama ``build``.
+    """
+    source = df.attrs.get('source')
+    if source is None:
+        return build(df)
+    return _get_store(source).derived(df, key, build, update)
+
+
+def load_data(path=DATA_PATH):
+    """
+    Retorna o DataFrame compartilhado por todas as sessões do processo,
+    sempre na versão atual do CSV. O objeto retornado não deve ser
+    modificado in-place.
+    """
+    try:
+        store = _get_store(str(path))
+        if store.df is None:
+            with st.spinner("Carregando dados..."):
+                return store.current()
+        return store.current()
+    except Exception as e:
+        if not Path(path).exists():
+            st.error(f"'{Path(path).name}' não encontrado")
+        else:
+            st.error(f"Ocorreu um erro ao carregar o arquivo: {e}")
+        return None
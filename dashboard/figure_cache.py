@@ -0,0 +1,92 @@
+"""
+Cache de figuras compartilhado entre sessões e páginas.
+
+Cada figura é guardada já serializada (JSON do Plotly), identificada pelo id
+do gráfico, pela versão do dataset e pelo estado dos filtros. A memória total
+é limitada e as figuras usadas há mais tempo são descartadas primeiro.
+"""
+import json
+import math
+import threading
+from collections import OrderedDict
+
+import streamlit as st
+
+from dashboard.data import dataset_version
+from dashboard.profiling import measure
+
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+
+class FigureCache:
+    """LRU de figuras serializadas, limitado por ``max_bytes``."""
+
+    def __init__(self, max_bytes=MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key, payload):
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._entries[key] = payload
+            self.size += len(payload)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def get_or_build(self, key, build):
+        """
+        Retorna ``(json, veio_do_cache)`` da figura em ``key``, chamando
+        ``build()`` apenas se não estiver no cache.
+        """
+        payload = self.get(key)
+        if payload is not None:
+            return payload, True
+        payload = build().to_json()
+        self.put(key, payload)
+        return payload, False
+
+
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache()
+
+
+def quantize_range(value_range):
+    """Faixa de idade em anos inteiros; como as idades são inteiras, não muda o resultado."""
+    return math.ceil(value_range[0]), math.floor(value_range[1])
+
+
+def cached_chart(chart_id, df, build, **state):
+    """
+    Especificação (dict) do gráfico ``chart_id`` para ``df`` e o estado dos
+    filtros em ``state``, pronta para ``st.plotly_chart``. ``build`` só é
+    chamado quando a combinação ainda não está no cache.
+    """
+    with measure('figure', chart_id) as details:
+        version = dataset_version(df)
+        if version is None:
+            payload, details['cached'] = build().to_json(), False
+        else:
+            key = (chart_id, version, tuple(sorted(state.items())))
+            payload, details['cached'] = get_figure_cache().get_or_build(key, build)
+        details['bytes'] = len(payload)
+        return json.loads(payload)
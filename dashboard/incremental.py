@@ -0,0 +1,266 @@
+"""
+Treino incremental do classificador, sem carregar o dataset inteiro.
+
+O CSV é lido em blocos (``read_csv_chunks``) e cada bloco acrescenta árvores
+novas à floresta (``warm_start``), treinadas só com as linhas daquele bloco.
+O conjunto de teste é uma amostra uniforme do fluxo mantida por reservoir
+sampling: cada linha entra no sorteio com probabilidade ``HOLDOUT_FRACTION``
+e o reservatório guarda no máximo ``HOLDOUT_ROWS`` linhas. Linhas que saem
+do reservatório passam a ser usadas no treino, então teste e treino nunca se
+misturam.
+
+O estado (floresta, reservatório e posição no CSV) é salvo como checkpoint.
+Quando o CSV só ganhou linhas no final, apenas as linhas novas são lidas e
+viram árvores novas; qualquer outra mudança refaz o treino do zero.
+
+Atualização do checkpoint (e treino completo na primeira vez):
+
+    python -m dashboard.incremental [--csv alzheimers_disease_data.csv] [--rebuild]
+
+Comparação com a floresta treinada de uma vez, no mesmo conjunto de teste:
+
+    python -m dashboard.incremental --compare
+
+Com ``DASHBOARD_TRAINING=incremental`` o dashboard usa este treino em vez da
+busca de hiperparâmetros (ver ``dashboard.model``).
+"""
+import argparse
+import os
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import parallel_config
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, confusion_matrix
+
+from dashboard.cache_backend import get_backend
+from dashboard.data import (
+    CACHE_DIR, DATA_PATH, TARGET, as_numeric, is_append, read_csv_chunks, read_csv_tail,
+    read_dataset, source_position,
+)
+from dashboard.model import MODEL_DIR, save_artifact
+from dashboard.profiling import max_rss_mb
+from dashboard.search import N_JOBS, RANDOM_STATE
+
+CHUNK_ROWS = 100_000
+# Linhas acumuladas antes de treinar novas árvores (anexações pequenas esperam a próxima).
+MIN_FIT_ROWS = 1_000
+INITIAL_TREES = 100
+TREES_PER_FIT = 25
+TREE_PARAMS = {'max_depth': 20, 'min_samples_split': 5}
+HOLDOUT_FRACTION = 0.25
+HOLDOUT_ROWS = 20_000
+
+
+class IncrementalForest:
+    """Floresta que cresce a cada bloco de linhas, com teste por reservoir sampling."""
+
+    def __init__(self, chunk_rows=CHUNK_ROWS, holdout_rows=HOLDOUT_ROWS, holdout_fraction=HOLDOUT_FRACTION):
+        self.chunk_rows = chunk_rows
+        self.holdout_rows = holdout_rows
+        self.holdout_fraction = holdout_fraction
+        self.rng = np.random.default_rng(RANDOM_STATE)
+        self.features = None
+        self.model = None
+        self.source = None  # posição do CSV já consumida (ver ``source_position``)
+        self.rows = 0
+        self.offered = 0  # linhas que já entraram no sorteio do reservatório
+        self.holdout_X = self.holdout_y = self.holdout_ids = None
+        self._pending = []
+        self.fits = []
+
+    def _matrix(self, df):
+        return as_numeric(df, self.features).to_numpy(dtype=np.float32), df[TARGET].to_numpy(dtype=np.int8)
+
+    def _split(self, X, y):
+        """Atualiza o reservatório com o bloco e retorna as linhas que vão para o treino."""
+        ids = np.arange(self.rows, self.rows + len(X))
+        offered = np.flatnonzero(self.rng.random(len(X)) < self.holdout_fraction)
+        train = np.ones(len(X), dtype=bool)
+        train[offered] = False
+
+        # Enquanto houver espaço, as linhas sorteadas entram direto.
+        free = self.holdout_rows - len(self.holdout_y)
+        filled, offered = offered[:free], offered[free:]
+        self.holdout_X = np.concatenate([self.holdout_X, X[filled]])
+        self.holdout_y = np.concatenate([self.holdout_y, y[filled]])
+        self.holdout_ids = np.concatenate([self.holdout_ids, ids[filled]])
+        self.offered += len(filled)
+
+        # Algoritmo R: a t-ésima linha sorteada substitui a posição j < capacidade, j uniforme em [0, t).
+        positions = self.offered + 1 + np.arange(len(offered))
+        slots = (self.rng.random(len(offered)) * positions).astype(np.int64)
+        self.offered += len(offered)
+        train[offered] = True
+        accepted = slots < self.holdout_rows
+        offered, slots = offered[accepted], slots[accepted]
+        # Se a mesma posição for sorteada mais de uma vez no bloco, fica a última linha.
+        last = len(slots) - 1 - np.unique(slots[::-1], return_index=True)[1]
+        offered, slots = offered[last], slots[last]
+        train[offered] = False
+
+        evicted_X, evicted_y = self.holdout_X[slots], self.holdout_y[slots]
+        self.holdout_X[slots], self.holdout_y[slots], self.holdout_ids[slots] = X[offered], y[offered], ids[offered]
+        return np.concatenate([X[train], evicted_X]), np.concatenate([y[train], evicted_y])
+
+    def partial_fit(self, df):
+        """Consome as linhas de ``df``: parte vai para o reservatório, o restante treina novas árvores."""
+        if self.features is None:
+            self.features = [col for col in df.columns if col != TARGET]
+            self.holdout_X = np.empty((0, len(self.features)), dtype=np.float32)
+            self.holdout_y = np.empty(0, dtype=np.int8)
+            self.holdout_ids = np.empty(0, dtype=np.int64)
+        for start in range(0, len(df), self.chunk_rows):
+            X, y = self._matrix(df.iloc[start:start + self.chunk_rows])
+            self._pending.append(self._split(X, y))
+            self.rows += len(X)
+            self._fit_pending()
+        return self
+
+    def _fit_pending(self, force=False):
+        X = np.concatenate([X for X, _ in self._pending]) if self._pending else None
+        y = np.concatenate([y for _, y in self._pending]) if self._pending else None
+        # Árvores novas precisam ver as duas classes, senão a floresta fica inconsistente.
+        if X is None or len(np.unique(y)) < 2 or (len(X) < MIN_FIT_ROWS and not force):
+            return
+
+        start = time.perf_counter()
+        if self.model is None:
+            self.model = RandomForestClassifier(
+                n_estimators=0, warm_start=True, random_state=RANDOM_STATE, **TREE_PARAMS
+            )
+        trees = max(TREES_PER_FIT, INITIAL_TREES - self.model.n_estimators)
+        self.model.set_params(n_estimators=self.model.n_estimators + trees, n_jobs=N_JOBS)
+        with parallel_config(backend='threading'):
+            # Com os nomes das colunas, o modelo aceita DataFrames na predição como o da busca.
+            self.model.fit(pd.DataFrame(X, columns=self.features, copy=False), y)
+        # O modelo salvo prevê em um único núcleo, como o estimador original.
+        self.model.set_params(n_jobs=None)
+        self._pending = []
+        self.fits.append({'rows': len(X), 'trees': trees, 'seconds': time.perf_counter() - start})
+
+    def finish(self):
+        """Treina com as linhas pendentes se ainda não houver modelo (datasets pequenos)."""
+        if self.model is None:
+            self._fit_pending(force=True)
+        return self
+
+    @property
+    def pending_rows(self):
+        return sum(len(y) for _, y in self._pending)
+
+    def evaluate(self, model=None):
+        """Acurácia e matriz de confusão de ``model`` (padrão: a floresta) no reservatório."""
+        X = pd.DataFrame(self.holdout_X, columns=self.features, copy=False)
+        y_pred = (model or self.model).predict(X)
+        return {
+            'accuracy': accuracy_score(self.holdout_y, y_pred),
+            'confusion_matrix': confusion_matrix(self.holdout_y, y_pred).tolist(),
+            'test_size': len(self.holdout_y),
+        }
+
+
+def checkpoint_path(csv_path=DATA_PATH):
+    return MODEL_DIR / f'incremental-{Path(csv_path).stem}.joblib'
+
+
+def update_checkpoint(csv_path=DATA_PATH, rebuild=False, chunk_rows=CHUNK_ROWS):
+    """
+    Atualiza o checkpoint com as linhas anexadas ao CSV desde o último treino,
+    ou treina do zero se não houver checkpoint ou o CSV tiver mudado de outra
+    forma. Retorna o ``IncrementalForest`` atualizado.
+    """
+    path = checkpoint_path(csv_path)
+    with get_backend().lock(str(path.relative_to(CACHE_DIR))):
+        forest = None if rebuild or not path.exists() else joblib.load(path)
+        position = source_position(csv_path)
+        if forest is not None and forest.source == position:
+            return forest
+
+        if forest is not None and is_append(csv_path, forest.source, os.stat(csv_path)):
+            # Só até a posição registrada: linhas anexadas depois ficam para a próxima atualização.
+            tail = read_csv_tail(csv_path, forest.source['size'], position['size'])
+            chunks = [] if tail is None else [tail]
+        else:
+            forest = IncrementalForest(chunk_rows)
+            chunks = read_csv_chunks(csv_path, chunk_rows, size=position['size'])
+
+        for chunk in chunks:
+            forest.partial_fit(chunk)
+        forest.finish()
+        forest.source = position
+        save_artifact(forest, path)
+    return forest
+
+
+def incremental_artifact(forest, fingerprint=None):
+    """Artefato no formato de ``train_classification_model`` a partir da floresta incremental."""
+    return {
+        'fingerprint': fingerprint,
+        'trained_at': time.time(),
+        'train_seconds': sum(fit['seconds'] for fit in forest.fits),
+        'model': forest.model,
+        'features': forest.features,
+        'best_params': {**TREE_PARAMS, 'n_estimators': forest.model.n_estimators},
+        'incremental': {'rows': forest.rows, 'fits': len(forest.fits), 'pending_rows': forest.pending_rows},
+        'feature_importances': pd.DataFrame({
+            'feature': forest.features,
+            'importance': forest.model.feature_importances_,
+        }).sort_values('importance', ascending=False),
+        'metrics': forest.evaluate(),
+    }
+
+
+def compare_full_batch(forest, csv_path=DATA_PATH):
+    """
+    Treina uma floresta com os mesmos parâmetros e número de árvores sobre
+    todas as linhas de treino em memória e avalia as duas no reservatório.
+    """
+    df = read_dataset(csv_path)
+    train = np.ones(len(df), dtype=bool)
+    train[forest.holdout_ids] = False
+    X = as_numeric(df, forest.features)[train]
+    y = df[TARGET][train]
+
+    start = time.perf_counter()
+    model = RandomForestClassifier(
+        n_estimators=forest.model.n_estimators, random_state=RANDOM_STATE, n_jobs=N_JOBS, **TREE_PARAMS
+    )
+    with parallel_config(backend='threading'):
+        model.fit(X, y)
+    batch_seconds = time.perf_counter() - start
+    return pd.DataFrame([
+        {'training': 'incremental', 'train_rows': forest.rows - len(forest.holdout_y) - forest.pending_rows,
+         'seconds': sum(fit['seconds'] for fit in forest.fits), **forest.evaluate()},
+        {'training': 'full batch', 'train_rows': len(y), 'seconds': batch_seconds, **forest.evaluate(model)},
+    ]).drop(columns='confusion_matrix')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Treino incremental do classificador, em blocos.")
+    parser.add_argument('--csv', default=str(DATA_PATH), help="Caminho do dataset.")
+    parser.add_argument('--rebuild', action='store_true', help="Descarta o checkpoint e treina do zero.")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help="Linhas lidas do CSV por bloco.")
+    parser.add_argument('--compare', action='store_true', help="Compara com a floresta treinada de uma vez.")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    forest = update_checkpoint(args.csv, rebuild=args.rebuild, chunk_rows=args.chunk_rows)
+    metrics = forest.evaluate()
+    print(f"Checkpoint: {checkpoint_path(args.csv)}")
+    print(f"Linhas: {forest.rows} ({metrics['test_size']} no teste, {forest.pending_rows} pendentes)")
+    print(f"Árvores: {forest.model.n_estimators} em {len(forest.fits)} treinos")
+    print(f"Acurácia (teste): {metrics['accuracy']:.2%}")
+    print(f"Tempo total: {time.perf_counter() - start:.1f}s, pico de memória {max_rss_mb():.0f} MB")
+
+    if args.compare:
+        report = compare_full_batch(forest, args.csv)
+        print(report.to_string(index=False, float_format=lambda v: f'{v:.4f}'))
+        print(f"Pico de memória após o treino completo: {max_rss_mb():.0f} MB")
+
+
+if __name__ == '__main__':
+    main()
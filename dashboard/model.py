@@ -0,0 +1,241 @@
+"""
+Treino e armazenamento do classificador de diagnóstico.
+
+O modelo é salvo em disco como um artefato (estimador, métricas de teste e
+importância das variáveis) identificado pelo fingerprint do dataset. A página
+de predição apenas carrega esse artefato; quando o dataset muda, um novo
+modelo é treinado em segundo plano enquanto o anterior continua em uso. Com
+várias réplicas usando o mesmo backend de cache, só uma treina (sob o lock
+do backend) e as demais mapeiam o artefato salvo. Com
+``DASHBOARD_TRAINING=incremental``, o artefato vem do treino em blocos de
+``dashboard.incremental``, que só processa as linhas anexadas ao CSV.
+
+Treino offline:
+
+    python -m dashboard.model [--csv alzheimers_disease_data.csv] [--force]
+                              [--strategy grid|halving|halving_random|warm_start] [--hist-gb]
+
+Comparação das estratégias de busca (não salva artefato):
+
+    python -m dashboard.model --compare [--hist-gb]
+"""
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+import pandas as pd
+import streamlit as st
+
+from dashboard.cache_backend import get_backend
+from dashboard.data import CACHE_DIR, DATA_PATH, TARGET, as_numeric, read_dataset, source_fingerprint
+
+MODEL_DIR = CACHE_DIR / 'models'
+
+# 'batch': busca de hiperparâmetros com o dataset inteiro em memória;
+# 'incremental': floresta atualizada em blocos a partir de um checkpoint (ver dashboard.incremental).
+TRAINING = os.environ.get('DASHBOARD_TRAINING', 'batch')
+
+# Estratégia usada pelo treino em segundo plano da página (ver dashboard.search).
+SEARCH_STRATEGY = os.environ.get('DASHBOARD_SEARCH_STRATEGY', 'grid')
+INCLUDE_HIST_GB = os.environ.get('DASHBOARD_SEARCH_HIST_GB') == '1'
+
+
+def train_classification_model(df, fingerprint=None, strategy=SEARCH_STRATEGY, include_hist_gb=INCLUDE_HIST_GB):
+    """
+    Busca os melhores hiperparâmetros com a estratégia escolhida e treina o modelo.
+    Retorna o artefato com o estimador, as métricas no conjunto de teste, a
+    importância das variáveis e o relatório da busca.
+    """
+    # Importados só aqui: as páginas apenas carregam o artefato salvo.
+    from sklearn.inspection import permutation_importance
+    from sklearn.metrics import accuracy_score, confusion_matrix
+    from sklearn.model_selection import train_test_split
+
+    from dashboard.search import search_model
+
+    start = time.perf_counter()
+    features = [col for col in df.columns if col != TARGET]
+
+    X = as_numeric(df, features)
+    y = df[TARGET]
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.25, random_state=42, stratify=y
+    )
+
+    best_model, best_params, search_report = search_model(X_train, y_train, strategy, include_hist_gb)
+    y_pred_test = best_model.predict(X_test)
+
+    if hasattr(best_model, 'feature_importances_'):
+        importances = best_model.feature_importances_
+    else:
+        importances = permutation_importance(
+            best_model, X_test, y_test, n_repeats=5, random_state=42
+        ).importances_mean
+
+    feature_importances = pd.DataFrame({
+        'feature': features,
+        'importance': importances
+    }).sort_values('importance', ascending=False)
+
+    return {
+        'fingerprint': fingerprint,
+        'trained_at': time.time(),
+        'train_seconds': time.perf_counter() - start,
+        'model': best_model,
+        'features': features,
+        'best_params': best_params,
+        'search': search_report,
+        'feature_importances': feature_importances,
+        'metrics': {
+            'accuracy': accuracy_score(y_test, y_pred_test),
+            'confusion_matrix': confusion_matrix(y_test, y_pred_test).tolist(),
+            'test_size': len(y_test),
+        },
+    }
+
+
+def artifact_path(fingerprint):
+    return MODEL_DIR / f'model-{fingerprint[:16]}.joblib'
+
+
+def latest_artifact_path():
+    """Artefato salvo mais recentemente, de qualquer versão do dataset."""
+    paths = list(MODEL_DIR.glob('model-*.joblib'))
+    return max(paths, key=lambda p: p.stat().st_mtime) if paths else None
+
+
+def save_artifact(artifact, path):
+    MODEL_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+    joblib.dump(artifact, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def load_artifact(path):
+    # Sem compressão, os arrays das árvores são mapeados direto do disco.
+    return joblib.load(path, mmap_mode='r')
+
+
+def build_artifact(csv_path=DATA_PATH, force=False, fingerprint=None, **train_options):
+    """
+    Treina e salva o modelo da versão atual do CSV, se ainda não existir.
+    Réplicas que pedirem o mesmo modelo ao mesmo tempo esperam o treino da
+    primeira em vez de treinar de novo.
+    """
+    fingerprint = fingerprint or source_fingerprint(csv_path)
+    path = artifact_path(fingerprint)
+    if force:
+        path.unlink(missing_ok=True)
+
+    def build(path):
+        if TRAINING == 'incremental':
+            from dashboard.incremental import incremental_artifact, update_checkpoint
+            artifact = incremental_artifact(update_checkpoint(csv_path), fingerprint)
+        else:
+            artifact = train_classification_model(read_dataset(csv_path), fingerprint, **train_options)
+        artifact['built_by'] = os.getpid()
+        save_artifact(artifact, path)
+
+    return get_backend().get_or_build(str(path.relative_to(CACHE_DIR)), build)
+
+
+def compare_strategies(df, include_hist_gb=False):
+    """Treina com cada estratégia e retorna um DataFrame com tempos e acurácias."""
+    from dashboard.search import STRATEGIES
+
+    rows = []
+    for strategy in STRATEGIES:
+        artifact = train_classification_model(df, strategy=strategy, include_hist_gb=include_hist_gb)
+        rows.append({
+            **artifact['search'],
+            'test_accuracy': artifact['metrics']['accuracy'],
+            'best_params': artifact['best_params'],
+        })
+    return pd.DataFrame(rows)
+
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='model-training')
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def start_background_training(fingerprint, csv_path=DATA_PATH):
+    """Agenda o treino para o fingerprint, reaproveitando um job já em andamento."""
+    with _jobs_lock:
+        job = _jobs.get(fingerprint)
+        if job is None or (job.done() and job.exception() is not None):
+            job = _executor.submit(build_artifact, csv_path, fingerprint=fingerprint)
+            _jobs[fingerprint] = job
+        return job
+
+
+@st.cache_resource(max_entries=2)
+def _load_cached(path, mtime_ns):
+    return load_artifact(path)
+
+
+def _load(path):
+    return _load_cached(str(path), path.stat().st_mtime_ns)
+
+
+def get_model(df):
+    """
+    Retorna ``(artefato, desatualizado)`` para o dataset ``df`` (de
+    ``load_data``). Se não houver modelo para essa versão, inicia o treino em
+    segundo plano e devolve o último modelo salvo; só espera o treino quando
+    nenhum modelo existe ainda.
+    """
+    try:
+        # O fingerprint vem do DatasetStore, sem ler o CSV a cada rerun.
+        csv_path = df.attrs.get('source', DATA_PATH)
+        fingerprint = df.attrs.get('fingerprint') or source_fingerprint(csv_path)
+        path = artifact_path(fingerprint)
+        if path.exists():
+            return _load(path), False
+
+        job = start_background_training(fingerprint, csv_path)
+        previous = latest_artifact_path()
+        if previous is not None:
+            return _load(previous), True
+
+        with st.spinner("Treinando o modelo pela primeira vez..."):
+            return _load(job.result()), False
+    except KeyError as e:
+        st.error(f"Erro: A coluna {e} não foi encontrada no seu dataset.")
+    except Exception as e:
+        st.error(f"Ocorreu um erro ao treinar o modelo: {e}")
+    return None, False
+
+
+def main(argv=None):
+    from dashboard.search import STRATEGIES
+
+    parser = argparse.ArgumentParser(description="Treina e salva o classificador de diagnóstico.")
+    parser.add_argument('--csv', default=str(DATA_PATH), help="Caminho do dataset.")
+    parser.add_argument('--force', action='store_true', help="Treina mesmo se já houver artefato para o dataset.")
+    parser.add_argument('--strategy', choices=list(STRATEGIES), default=SEARCH_STRATEGY, help="Estratégia de busca de hiperparâmetros.")
+    parser.add_argument('--hist-gb', action='store_true', default=INCLUDE_HIST_GB, help="Inclui HistGradientBoosting como candidato.")
+    parser.add_argument('--compare', action='store_true', help="Compara todas as estratégias em vez de salvar um artefato.")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        report = compare_strategies(read_dataset(args.csv), include_hist_gb=args.hist_gb)
+        with pd.option_context('display.width', 200, 'display.max_colwidth', 80):
+            print(report.to_string(index=False, float_format=lambda v: f'{v:.4f}'))
+        return
+
+    start = time.perf_counter()
+    path = build_artifact(args.csv, force=args.force, strategy=args.strategy, include_hist_gb=args.hist_gb)
+    artifact = load_artifact(path)
+    print(f"Artefato: {path}")
+    print(f"Melhores hiperparâmetros: {artifact['best_params']}")
+    print(f"Acurácia (teste): {artifact['metrics']['accuracy']:.2%}")
+    print(f"Tempo total: {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
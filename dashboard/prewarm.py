@@ -0,0 +1,102 @@
+"""
+Pré-aquecimento dos caches antes de o servidor receber acessos.
+
+Depois de um deploy (ou de uma réplica nova), o primeiro acesso pagaria a
+conversão do CSV, o treino do modelo e as correlações. Este comando constrói
+tudo o que fica em disco, no backend de cache: o cache do dataset, o
+artefato do modelo, o acumulador de Pearson e a matriz de Spearman. Deve
+rodar antes do servidor:
+
+    python -m dashboard.prewarm && streamlit run 1_🏠_Home.py
+
+Com ``--pages`` também mede o tempo de inicialização de cada página em um
+processo novo (imports e primeira execução, já com os caches prontos) e
+lista os módulos pesados que ela carregou. O benchmark registra as mesmas
+medidas com ``--startup``.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+from dashboard.correlation import build_accumulator, build_spearman
+from dashboard.data import DATA_PATH, ROOT_DIR, read_dataset_with_meta
+
+PAGES = [ROOT_DIR / '1_🏠_Home.py', *sorted((ROOT_DIR / 'pages').glob('*.py'))]
+
+# Módulos que só devem ser carregados pelas páginas que precisam deles.
+HEAVY_MODULES = ['plotly.express', 'sklearn', 'sklearn.model_selection', 'sklearn.inspection', 'scipy.stats']
+
+_STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=600).run()
+finished = time.perf_counter()
+print(json.dumps({
+    'seconds': finished - start,
+    'streamlit_seconds': imported - start,
+    'page_seconds': finished - imported,
+    'errors': len(at.exception) + len(at.error),
+    'heavy_modules': [m for m in json.loads(sys.argv[2]) if m in sys.modules],
+}))
+"""
+
+
+def prewarm(csv_path=DATA_PATH, model=True):
+    """Constrói os caches em disco de ``csv_path`` e retorna o tempo de cada etapa, em segundos."""
+    timings = {}
+
+    def step(name, build):
+        start = time.perf_counter()
+        result = build()
+        timings[name] = time.perf_counter() - start
+        print(f"{name}: {timings[name]:.2f}s", flush=True)
+        return result
+
+    df, meta = step('dataset', lambda: read_dataset_with_meta(csv_path))
+    step('pearson', lambda: build_accumulator(df, csv_path, meta))
+    step('spearman', lambda: build_spearman(df, csv_path, meta['sha256']))
+    if model:
+        from dashboard.model import build_artifact
+        step('model', lambda: build_artifact(csv_path))
+    return timings
+
+
+def page_startup(page):
+    """Inicialização de ``page`` em um processo novo: tempos, erros e módulos pesados carregados."""
+    result = subprocess.run(
+        [sys.executable, '-c', _STARTUP_SCRIPT, str(page), json.dumps(HEAVY_MODULES)],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def page_startups(pages=PAGES):
+    return {page.stem: page_startup(page) for page in pages}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Constrói os caches em disco antes de iniciar o servidor.")
+    parser.add_argument('--csv', default=str(DATA_PATH), help="Caminho do dataset.")
+    parser.add_argument('--no-model', action='store_true', help="Não treina o modelo se ainda não houver artefato.")
+    parser.add_argument('--pages', action='store_true', help="Mede a inicialização de cada página depois do pré-aquecimento.")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    prewarm(args.csv, model=not args.no_model)
+    print(f"Caches prontos em {time.perf_counter() - start:.1f}s")
+
+    if args.pages:
+        for name, stats in page_startups().items():
+            heavy = ', '.join(stats['heavy_modules']) or '-'
+            print(
+                f"{name}: {stats['seconds']:.2f}s (streamlit {stats['streamlit_seconds']:.2f}s, "
+                f"página {stats['page_seconds']:.2f}s), erros: {stats['errors']}, módulos pesados: {heavy}"
+            )
+
+
+if __name__ == '__main__':
+    main()
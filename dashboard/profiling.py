@@ -0,0 +1,178 @@
+"""
+Instrumentação opcional do tempo gasto em cada execução das páginas.
+
+Ativada com ``DASHBOARD_PROFILE=1`` ou com ``?profile=1`` na URL. Cada página
+chama ``start_rerun`` no início e ``render_panel`` no fim; entre os dois, cargas,
+filtros, construção de figuras e cada ``plotly_chart`` são medidos. O
+detalhamento da execução atual aparece na barra lateral e as amostras são
+anexadas a ``.cache/profile.jsonl`` (ou ``DASHBOARD_PROFILE_LOG``), uma por
+linha, para análise posterior:
+
+    pd.read_json('.cache/profile.jsonl', lines=True)
+
+Desativada, as funções apenas executam o código medido.
+"""
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+
+from dashboard.data import CACHE_DIR
+
+PROFILE_ENV = 'DASHBOARD_PROFILE'
+PROFILE_PARAM = 'profile'
+LOG_PATH = Path(os.environ.get('DASHBOARD_PROFILE_LOG', CACHE_DIR / 'profile.jsonl'))
+
+_SESSION_KEY = '_profile'
+_log_lock = threading.Lock()
+
+
+class RerunProfile:
+    """Amostras de uma execução (rerun) de uma página."""
+
+    def __init__(self, page):
+        self.page = page
+        self.rerun_id = uuid.uuid4().hex[:12]
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.samples = []
+
+    def add(self, kind, element, seconds, nbytes=None, **details):
+        self.samples.append({
+            'kind': kind, 'element': element, 'ms': seconds * 1000, 'bytes': nbytes, **details,
+        })
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self._start
+
+    def table(self):
+        table = pd.DataFrame(self.samples, columns=['kind', 'element', 'ms', 'bytes', 'cached'])
+        return table.dropna(axis=1, how='all')
+
+    def log_records(self, session_id):
+        base = {
+            'timestamp': self.started_at, 'session': session_id,
+            'page': self.page, 'rerun': self.rerun_id,
+        }
+        records = [{**base, **sample} for sample in self.samples]
+        records.append({**base, 'kind': 'rerun', 'element': 'total', 'ms': self.elapsed * 1000, 'bytes': None})
+        return records
+
+
+def enabled():
+    if os.environ.get(PROFILE_ENV) == '1':
+        return True
+    try:
+        return st.query_params.get(PROFILE_PARAM) == '1'
+    except Exception:
+        # Fora de ``streamlit run`` não há parâmetros de URL.
+        return False
+
+
+def _current():
+    try:
+        return st.session_state.get(_SESSION_KEY)
+    except Exception:
+        return None
+
+
+def start_rerun(page):
+    """Inicia a medição da execução atual da página, se a instrumentação estiver ativa."""
+    profile = RerunProfile(page) if enabled() else None
+    try:
+        st.session_state[_SESSION_KEY] = profile
+        st.session_state.setdefault('_profile_session', uuid.uuid4().hex[:12])
+    except Exception:
+        pass
+    return profile
+
+
+@contextmanager
+def measure(kind, element):
+    """
+    Mede o bloco como ``kind`` (``load``, ``filter``, ``figure``, ``chart``...).
+    O dicionário devolvido aceita ``bytes`` e outros detalhes da amostra.
+    """
+    profile = _current()
+    details = {}
+    if profile is None:
+        yield details
+        return
+    start_time = time.perf_counter()
+    try:
+        yield details
+    finally:
+        profile.add(kind, element, time.perf_counter() - start_time, details.pop('bytes', None), **details)
+
+
+def _figure_title(fig):
+    layout = fig.get('layout', {}) if isinstance(fig, dict) else fig.to_plotly_json().get('layout', {})
+    title = layout.get('title')
+    return title.get('text') if isinstance(title, dict) else title
+
+
+def _payload_bytes(fig):
+    payload = json.dumps(fig) if isinstance(fig, dict) else fig.to_json()
+    return len(payload.encode())
+
+
+def plotly_chart(fig, name=None, **kwargs):
+    """``st.plotly_chart`` medido: tempo da chamada e tamanho do JSON da figura."""
+    if _current() is None:
+        return st.plotly_chart(fig, **kwargs)
+    with measure('chart', name or _figure_title(fig) or 'figura') as details:
+        details['bytes'] = _payload_bytes(fig)
+        return st.plotly_chart(fig, **kwargs)
+
+
+def max_rss_mb():
+    """Pico de memória residente do processo em MB, ou ``nan`` onde não há ``resource`` (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return float('nan')
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Em KiB no Linux e em bytes no macOS.
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def append_log(records, path=LOG_PATH):
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lines = ''.join(json.dumps(record, default=str) + '\n' for record in records)
+        with _log_lock, open(path, 'a') as f:
+            f.write(lines)
+    except OSError:
+        pass
+
+
+def render_panel():
+    """Mostra o detalhamento da execução atual na barra lateral e grava as amostras no log."""
+    profile = _current()
+    if profile is None:
+        return
+    table = profile.table()
+    total_ms = profile.elapsed * 1000
+
+    number_format = {col: fmt for col, fmt in (('ms', '{:.1f}'), ('bytes', '{:,.0f}')) if col in table}
+
+    with st.sidebar.expander("⏱️ Tempo desta execução", expanded=True):
+        st.metric("Total", f"{total_ms:.0f} ms")
+        if not table.empty:
+            by_kind = table.groupby('kind', sort=False)[list(number_format)].sum(min_count=1)
+            st.dataframe(by_kind.style.format(number_format, na_rep=''))
+            st.dataframe(
+                table.sort_values('ms', ascending=False).style.format(number_format, na_rep=''),
+                hide_index=True,
+            )
+        st.caption(f"Amostras anexadas a {LOG_PATH}")
+
+    append_log(profile.log_records(st.session_state.get('_profile_session')))
@@ -0,0 +1,135 @@
+"""
+Classificação em lote de coortes de pacientes.
+
+O arquivo enviado (CSV ou Parquet) é lido em blocos; cada bloco passa por uma
+única chamada de ``predict_proba`` e o diagnóstico é derivado das
+probabilidades. O resultado é escrito incrementalmente, então a memória de
+trabalho depende do tamanho do bloco e não do tamanho do arquivo; na página
+o resultado vai para um arquivo em ``.cache/scored`` (``score_to_tempfile``),
+que guarda no máximo ``MAX_RESULT_FILES`` resultados de até ``MAX_RESULT_AGE``
+segundos.
+"""
+import io
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dashboard.data import CACHE_DIR
+
+CHUNK_SIZE = 50_000
+
+RESULTS_DIR = CACHE_DIR / 'scored'
+MAX_RESULT_FILES = 32
+MAX_RESULT_AGE = 24 * 60 * 60
+
+PREDICTION_COLUMN = 'PredictedDiagnosis'
+PROBABILITY_COLUMN = 'AlzheimerProbability'
+
+
+def predict_batch(model, X):
+    """Retorna ``(rótulos, probabilidades)`` com uma única passada de predict_proba."""
+    proba = model.predict_proba(X)
+    return model.classes_[proba.argmax(axis=1)], proba
+
+
+def _iter_csv(file, chunk_size):
+    file.seek(0, io.SEEK_END)
+    total = file.tell() or 1
+    file.seek(0)
+    for chunk in pd.read_csv(file, chunksize=chunk_size):
+        yield chunk, file.tell() / total
+
+
+def _iter_parquet(file, chunk_size):
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(file)
+    total = parquet.metadata.num_rows or 1
+    done = 0
+    for batch in parquet.iter_batches(batch_size=chunk_size):
+        done += batch.num_rows
+        yield batch.to_pandas(), done / total
+
+
+def iter_chunks(file, name, chunk_size=CHUNK_SIZE):
+    """Itera sobre ``(bloco, fração lida)`` de um arquivo CSV ou Parquet."""
+    if str(name).lower().endswith('.parquet'):
+        return _iter_parquet(file, chunk_size)
+    return _iter_csv(file, chunk_size)
+
+
+def score_chunk(model, features, chunk):
+    """Classifica um bloco, mantendo apenas as colunas que não são variáveis do modelo."""
+    missing = [col for col in features if col not in chunk.columns]
+    if missing:
+        raise ValueError(f"Colunas ausentes no arquivo: {', '.join(missing)}")
+
+    labels, proba = predict_batch(model, chunk[features].astype(np.float32))
+    positive = list(model.classes_).index(1)
+
+    scored = chunk.drop(columns=features)
+    scored[PREDICTION_COLUMN] = labels
+    scored[PROBABILITY_COLUMN] = proba[:, positive]
+    return scored
+
+
+def score_file(model, features, file, name, output, chunk_size=CHUNK_SIZE, on_progress=None):
+    """
+    Classifica o arquivo inteiro em blocos, escrevendo o CSV de saída em
+    ``output`` (arquivo de texto). Retorna o número de linhas classificadas.
+    """
+    rows = 0
+    for i, (chunk, progress) in enumerate(iter_chunks(file, name, chunk_size)):
+        scored = score_chunk(model, features, chunk)
+        scored.to_csv(output, header=i == 0, index=False)
+        rows += len(scored)
+        if on_progress is not None:
+            on_progress(min(progress, 1.0), rows)
+    return rows
+
+
+def _results_dir():
+    try:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        return RESULTS_DIR
+    except OSError:
+        # Sem permissão no cache: usa o diretório temporário do sistema.
+        return Path(tempfile.gettempdir())
+
+
+def prune_results(directory, keep=MAX_RESULT_FILES, max_age=MAX_RESULT_AGE):
+    """Apaga os resultados com mais de ``max_age`` segundos e os mais antigos além de ``keep``."""
+    files = []
+    for path in directory.glob('scored-*.csv'):
+        try:
+            files.append((path.stat().st_mtime, path))
+        except FileNotFoundError:
+            continue
+    files.sort(reverse=True)
+    now = time.time()
+    for i, (mtime, path) in enumerate(files):
+        if i >= keep or now - mtime > max_age:
+            path.unlink(missing_ok=True)
+
+
+def score_to_tempfile(model, features, file, name, chunk_size=CHUNK_SIZE, on_progress=None):
+    """
+    Como ``score_file``, mas grava o CSV de saída em um arquivo em disco.
+    Retorna ``(caminho, linhas classificadas)``. Os resultados antigos (de
+    qualquer sessão) são apagados antes, então o arquivo pode sumir depois
+    de ``MAX_RESULT_AGE`` segundos ou de ``MAX_RESULT_FILES`` resultados novos.
+    """
+    directory = _results_dir()
+    prune_results(directory, keep=MAX_RESULT_FILES - 1)
+    fd, path = tempfile.mkstemp(prefix='scored-', suffix='.csv', dir=directory)
+    try:
+        with open(fd, 'w', encoding='utf-8', newline='') as output:
+            rows = score_file(model, features, file, name, output, chunk_size, on_progress)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return Path(path), rows
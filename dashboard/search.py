@@ -0,0 +1,168 @@
+"""
+Estratégias de busca de hiperparâmetros para o classificador.
+
+- ``grid``: GridSearchCV exaustivo sobre ``PARAM_GRID`` (comportamento original);
+- ``halving``: HalvingGridSearchCV sobre a mesma grade, descartando os piores
+  candidatos com poucas amostras antes de usar o conjunto inteiro;
+- ``halving_random``: HalvingRandomSearchCV sobre um espaço mais amplo;
+- ``warm_start``: mesma grade, mas cada floresta cresce de 100 para 150 e 200
+  árvores reaproveitando as já treinadas, em vez de treinar três florestas.
+
+Com ``include_hist_gb`` um HistGradientBoostingClassifier também concorre e
+vence se tiver melhor acurácia na validação cruzada.
+
+O paralelismo usa threads (a construção das árvores libera o GIL), assim o
+tempo de CPU medido com ``time.process_time`` inclui todos os workers. O
+número de workers vem de ``DASHBOARD_TRAIN_JOBS`` (padrão: todos os núcleos),
+para limitar o treino quando a máquina é dividida com outras réplicas.
+"""
+import os
+import time
+from itertools import product
+
+import numpy as np
+from joblib import parallel_config
+from scipy.stats import randint
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import (
+    GridSearchCV, HalvingGridSearchCV, HalvingRandomSearchCV, StratifiedKFold
+)
+
+PARAM_GRID = {
+    'n_estimators': [100, 150, 200],
+    'max_depth': [10, 20, None], # None = sem limite de profundidade
+    'min_samples_split': [2, 5]
+}
+
+PARAM_DISTRIBUTIONS = {
+    'n_estimators': randint(50, 300),
+    'max_depth': [10, 20, 30, None],
+    'min_samples_split': randint(2, 11),
+    'max_features': ['sqrt', 'log2'],
+}
+
+HIST_GB_GRID = {
+    'learning_rate': [0.05, 0.1],
+    'max_leaf_nodes': [15, 31],
+}
+
+CV_FOLDS = 3
+RANDOM_STATE = 42
+N_JOBS = int(os.environ.get('DASHBOARD_TRAIN_JOBS', -1))
+
+
+def _grid(X, y, cv):
+    search = GridSearchCV(
+        RandomForestClassifier(random_state=RANDOM_STATE), PARAM_GRID,
+        cv=cv, n_jobs=N_JOBS, scoring='accuracy'
+    )
+    search.fit(X, y)
+    return search.best_estimator_, search.best_params_, search.best_score_
+
+
+def _halving(X, y, cv):
+    search = HalvingGridSearchCV(
+        RandomForestClassifier(random_state=RANDOM_STATE), PARAM_GRID,
+        cv=cv, factor=3, n_jobs=N_JOBS, scoring='accuracy', random_state=RANDOM_STATE
+    )
+    search.fit(X, y)
+    return search.best_estimator_, search.best_params_, search.best_score_
+
+
+def _halving_random(X, y, cv):
+    search = HalvingRandomSearchCV(
+        RandomForestClassifier(random_state=RANDOM_STATE), PARAM_DISTRIBUTIONS,
+        n_candidates=27, cv=cv, factor=3, n_jobs=N_JOBS, scoring='accuracy', random_state=RANDOM_STATE
+    )
+    search.fit(X, y)
+    return search.best_estimator_, search.best_params_, search.best_score_
+
+
+def _warm_start(X, y, cv):
+    """
+    Para cada combinação de ``max_depth``/``min_samples_split`` e cada fold,
+    a floresta é ampliada até cada valor de ``n_estimators`` com
+    ``warm_start``, avaliando a acurácia em cada etapa.
+    """
+    n_estimators = sorted(PARAM_GRID['n_estimators'])
+    other_keys = [key for key in PARAM_GRID if key != 'n_estimators']
+    folds = list(cv.split(X, y))
+    X, y = np.asarray(X), np.asarray(y)
+
+    scores = {}
+    for values in product(*(PARAM_GRID[key] for key in other_keys)):
+        params = dict(zip(other_keys, values))
+        fold_scores = np.zeros((len(folds), len(n_estimators)))
+        for i, (train, valid) in enumerate(folds):
+            rf = RandomForestClassifier(random_state=RANDOM_STATE, warm_start=True, n_jobs=N_JOBS, **params)
+            for j, n in enumerate(n_estimators):
+                rf.set_params(n_estimators=n)
+                rf.fit(X[train], y[train])
+                fold_scores[i, j] = rf.score(X[valid], y[valid])
+        for j, n in enumerate(n_estimators):
+            scores[tuple(sorted({**params, 'n_estimators': n}.items()))] = fold_scores[:, j].mean()
+
+    best = max(scores, key=scores.get)
+    best_params = dict(best)
+    model = RandomForestClassifier(random_state=RANDOM_STATE, n_jobs=N_JOBS, **best_params)
+    return model, best_params, scores[best]
+
+
+def _hist_gb(X, y, cv):
+    search = GridSearchCV(
+        HistGradientBoostingClassifier(max_iter=300, early_stopping=True, random_state=RANDOM_STATE),
+        HIST_GB_GRID, cv=cv, n_jobs=N_JOBS, scoring='accuracy'
+    )
+    search.fit(X, y)
+    return search.best_estimator_, search.best_params_, search.best_score_
+
+
+STRATEGIES = {
+    'grid': _grid,
+    'halving': _halving,
+    'halving_random': _halving_random,
+    'warm_start': _warm_start,
+}
+
+
+def cv_splitter():
+    """Folds da validação cruzada, os mesmos para todas as estratégias e para o HistGradientBoosting."""
+    return StratifiedKFold(CV_FOLDS, shuffle=True, random_state=RANDOM_STATE)
+
+
+def search_model(X, y, strategy='grid', include_hist_gb=False):
+    """
+    Executa a estratégia e retorna ``(modelo treinado, hiperparâmetros, relatório)``.
+    O relatório traz a estratégia, o tempo de relógio, o tempo de CPU e a
+    acurácia média na validação cruzada do modelo escolhido. Todas as
+    estratégias usam os folds de ``cv_splitter``, então ``cv_accuracy`` é
+    comparável entre elas.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Estratégia desconhecida: {strategy}. Opções: {', '.join(STRATEGIES)}")
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    with parallel_config(backend='threading'):
+        cv = cv_splitter()
+        model, params, cv_score = STRATEGIES[strategy](X, y, cv)
+        estimator = 'RandomForestClassifier'
+        if include_hist_gb:
+            hgb_model, hgb_params, hgb_score = _hist_gb(X, y, cv)
+            if hgb_score > cv_score:
+                model, params, cv_score = hgb_model, hgb_params, hgb_score
+                estimator = 'HistGradientBoostingClassifier'
+        if strategy == 'warm_start' and estimator == 'RandomForestClassifier':
+            model.fit(X, y)
+        if hasattr(model, 'n_jobs'):
+            # O modelo salvo prevê em um único núcleo, como o estimador original.
+            model.set_params(n_jobs=None)
+
+    report = {
+        'strategy': strategy,
+        'estimator': estimator,
+        'wall_seconds': time.perf_counter() - wall,
+        'cpu_seconds': time.process_time() - cpu,
+        'cv_accuracy': float(cv_score),
+    }
+    return model, params, report
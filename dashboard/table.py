@@ -0,0 +1,113 @@
+"""
+Tabela paginada do dataset.
+
+Ordenação e filtros são resolvidos aqui, sobre posições de linha, e apenas a
+página visível é copiada para o ``st.dataframe``. A ordem de cada coluna é
+calculada uma vez por versão do dataset e compartilhada entre sessões.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from dashboard.data import as_numeric, dataset_version, derived_cache
+
+PAGE_SIZES = [25, 50, 100, 500]
+
+
+def sort_order(df, column, ascending=True):
+    """
+    Posições das linhas ordenadas por ``column``. A ordenação é estável nos
+    dois sentidos: linhas empatadas mantêm a ordem original.
+    """
+    values = df[column]
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.cat.codes
+    values = values.to_numpy()
+    if ascending:
+        return np.argsort(values, kind='stable')
+    if values.dtype.kind in 'iuf':
+        # Chave negada (inteiros em int64, sem overflow); NaN e código -1 (ausente) ficam no fim.
+        key = -values if values.dtype.kind == 'f' else -values.astype(np.int64)
+        return np.argsort(key, kind='stable')
+    # Ordem estável do array invertido, desfeita a inversão: empates na ordem original.
+    return len(values) - 1 - np.argsort(values[::-1], kind='stable')[::-1]
+
+
+def filter_mask(df, filters):
+    """
+    Máscara booleana para ``filters``: ``{coluna: (mínimo, máximo)}`` para
+    intervalos ou ``{coluna: [valores]}`` para conjuntos de valores.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for column, condition in (filters or {}).items():
+        values = df[column]
+        if isinstance(condition, tuple):
+            values = values.to_numpy()
+            mask &= (values >= condition[0]) & (values <= condition[1])
+        else:
+            mask &= values.isin(condition).to_numpy()
+    return mask
+
+
+@st.cache_resource(max_entries=16)
+def _cached_sort_order(_df, version, column, ascending):
+    return sort_order(_df, column, ascending)
+
+
+def _sort_order(df, column, ascending):
+    version = dataset_version(df)
+    if version is None:
+        return sort_order(df, column, ascending)
+    return _cached_sort_order(df, version, column, ascending)
+
+
+def select_rows(df, sort_by=None, ascending=True, filters=None):
+    """
+    Posições das linhas após filtro e ordenação, ou ``None`` quando não há
+    nenhum dos dois (ordem original, sem custo).
+    """
+    positions = _sort_order(df, sort_by, ascending) if sort_by else None
+    if filters:
+        mask = filter_mask(df, filters)
+        positions = np.flatnonzero(mask) if positions is None else positions[mask[positions]]
+    return positions
+
+
+def page_rows(df, positions, page=0, page_size=PAGE_SIZES[0]):
+    """Copia apenas as linhas da página ``page`` (a partir de 0)."""
+    start = page * page_size
+    if positions is None:
+        return df.iloc[start:start + page_size]
+    return df.take(positions[start:start + page_size])
+
+
+def describe(df):
+    return as_numeric(df).describe().T
+
+
+def describe_updated(stats, df, tail):
+    """
+    ``describe()`` de ``df`` a partir do anterior e das linhas novas ``tail``:
+    contagem, média, desvio, mínimo e máximo são combinados sem reler os
+    dados; só os quartis são recalculados.
+    """
+    new = describe(tail)
+    n_a, n_b = stats['count'], new['count']
+    n = n_a + n_b
+    delta = new['mean'] - stats['mean']
+    m2 = stats['std'] ** 2 * (n_a - 1) + new['std'].fillna(0) ** 2 * (n_b - 1) + delta ** 2 * n_a * n_b / n
+
+    result = stats.copy()
+    result['count'] = n
+    result['mean'] = stats['mean'] + delta * n_b / n
+    result['std'] = np.sqrt(m2 / (n - 1))
+    result['min'] = np.minimum(stats['min'], new['min'])
+    result['max'] = np.maximum(stats['max'], new['max'])
+    quartiles = as_numeric(df, stats.index).quantile([0.25, 0.5, 0.75])
+    result[['25%', '50%', '75%']] = quartiles.T.to_numpy()
+    return result
+
+
+def describe_stats(df):
+    """``describe()`` do dataset, calculado uma vez por versão e atualizado com linhas novas."""
+    return derived_cache(df, 'describe', describe, describe_updated)
@@ -1,25 +1,20 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.express as px
+
+from dashboard.charts import age_box, age_histogram, diagnosis_count_bar, diagnosis_percent_bar
+from dashboard.cube import cohort_crosstab, cohort_filters, cohort_key
+from dashboard.data import load_data
+from dashboard.figure_cache import cached_chart, quantize_range
+from dashboard.profiling import measure, plotly_chart, render_panel, start_rerun
 
 st.set_page_config(
     page_title="Análise Demográfica",
     page_icon="📊",
     layout="wide"
 )
+start_rerun('Análise Demográfica')
 
-@st.cache_data
-def load_data():
-    try:
-        df = pd.read_csv('alzheimers_disease_data.csv')
-        df.drop(columns=["PatientID", "DoctorInCharge"], inplace=True)
-        return df
-    except FileNotFoundError:
-        st.error("'alzheimers_disease_data.csv' não encontrado")
-        return None
-
-df = load_data()
+with measure('load', 'load_data'):
+    df = load_data()
 
 st.title("📊 Análise Demográfica")
 
@@ -36,104 +31,85 @@ limiar = st.sidebar.slider(
 if df is not None:
     st.header('Distribuição por Idade')
     col1, col2 = st.columns(2)
-    df["Ethnicity"] = df["Ethnicity"].map({0:"Caucasian", 1:"African American", 2: "Asian", 3: "Other"})
-    df["Gender"] = df["Gender"].map({0:"Homem", 1:"Mulher"})
-    df["EducationLevel"] = df["EducationLevel"].map({0:"Nenhum", 1:"Ensino médio", 2: "Bacharelado", 3: "Pós"})
+    ethnicity_labels = {0:"Caucasian", 1:"African American", 2: "Asian", 3: "Other"}
+    gender_labels = {0:"Homem", 1:"Mulher"}
+    education_labels = {0:"Nenhum", 1:"Ensino médio", 2: "Bacharelado", 3: "Pós"}
+
+    age_range = quantize_range(limiar)
+    with st.sidebar.expander("Filtrar coorte"):
+        cohort = {**cohort_filters(st, 'filtro'), 'Age': age_range}
 
-    df_filtrado = df[(df["Age"] >= limiar[0]) & 
-                          (df["Age"] <= limiar[1])]
     with col1:
-        fig_age_box = px.box(
-            df,
-            x='Diagnosis',
-            y='Age',
-            color='Diagnosis',
-            title='Distribuição da Idade por Diagnóstico',
-            labels={'Age': 'Idade', 'Diagnosis': 'Diagnóstico'}
-        )
-        st.plotly_chart(fig_age_box, use_container_width=True)
+        fig_age_box = cached_chart('age_box', df, lambda: age_box(df))
+        plotly_chart(fig_age_box, use_container_width=True)
     with col2:
-        fig_age_hist = px.histogram(
-            df,
-            x='Age',
-            color='Diagnosis',
-            nbins=20,
-            title='Distribuição da Idade por Diagnóstico',
-            labels={'Age': 'Idade', 'count': 'Contagem'}
-        )
-        st.plotly_chart(fig_age_hist, use_container_width=True)
+        fig_age_hist = cached_chart('age_histogram', df, lambda: age_histogram(df))
+        plotly_chart(fig_age_hist, use_container_width=True)
 
     st.header('Distribuição por Gênero')
+    with measure('filter', 'gender_table'):
+        gender_table = cohort_crosstab(df, 'Gender', cohort, gender_labels)
     col1, col2 = st.columns(2)
     with col1:
-        fig_gender_count = px.histogram(
-            df_filtrado,
+        fig_gender_count = cached_chart('gender_count', df, lambda: diagnosis_count_bar(
+            gender_table,
             x='Gender',
-            color='Diagnosis',
-            barmode='group',
             title='Distribuição do Diagnóstico por Gênero',
             labels={'Gender': 'Gênero', 'count': 'Contagem'}
-        )
-        st.plotly_chart(fig_gender_count, use_container_width=True)
+        ), cohort=cohort_key(cohort))
+        plotly_chart(fig_gender_count, use_container_width=True)
     with col2:
-        fig_gender_prop = px.histogram(
-            df_filtrado,
+        fig_gender_prop = cached_chart('gender_prop', df, lambda: diagnosis_percent_bar(
+            gender_table,
             x='Gender',
-            color='Diagnosis',
-            barnorm='percent',
-            text_auto='.2f',
             title='Proporção do Diagnóstico por Gênero (%)',
             labels={'Gender': 'Gênero', 'percent': 'Porcentagem'}
-        )
-        st.plotly_chart(fig_gender_prop, use_container_width=True)
+        ), cohort=cohort_key(cohort))
+        plotly_chart(fig_gender_prop, use_container_width=True)
 
     st.header('Distribuição por Etnia')
+    with measure('filter', 'ethnicity_table'):
+        ethnicity_table = cohort_crosstab(df, 'Ethnicity', cohort, ethnicity_labels)
     col1, col2 = st.columns(2)
     with col1:
-        fig_ethnicity_count = px.histogram(
-            df_filtrado,
+        fig_ethnicity_count = cached_chart('ethnicity_count', df, lambda: diagnosis_count_bar(
+            ethnicity_table,
             x='Ethnicity',
-            color='Diagnosis',
-            barmode='group',
             title='Distribuição do Diagnóstico por Etnia',
             labels={'Ethnicity': 'Etnia', 'count': 'Contagem'}
-        )
-        st.plotly_chart(fig_ethnicity_count, use_container_width=True)
+        ), cohort=cohort_key(cohort))
+        plotly_chart(fig_ethnicity_count, use_container_width=True)
     with col2:
-        fig_ethnicity_prop = px.histogram(
-            df_filtrado,
+        fig_ethnicity_prop = cached_chart('ethnicity_prop', df, lambda: diagnosis_percent_bar(
+            ethnicity_table,
             x='Ethnicity',
-            color='Diagnosis',
-            barnorm='percent',
-            text_auto='.2f',
             title='Proporção do Diagnóstico por Etnia (%)',
             labels={'Ethnicity': 'Etnia', 'percent': 'Porcentagem'}
-        )
-        st.plotly_chart(fig_ethnicity_prop, use_container_width=True)
+        ), cohort=cohort_key(cohort))
+        plotly_chart(fig_ethnicity_prop, use_container_width=True)
 
     st.header('Distribuição por Nível de Escolaridade')
-    education_order = ['No Schooling', 'Primary School', 'High School', 'Bachelors Degree', 'Graduate Degree']
+    education_order = list(education_labels.values())
+    with measure('filter', 'education_table'):
+        education_table = cohort_crosstab(df, 'EducationLevel', cohort, education_labels)
     col1, col2 = st.columns(2)
     with col1:
-        fig_education_count = px.histogram(
-            df_filtrado,
+        fig_education_count = cached_chart('education_count', df, lambda: diagnosis_count_bar(
+            education_table,
             x='EducationLevel',
-            color='Diagnosis',
-            barmode='group',
             category_orders={'EducationLevel': education_order},
             title='Distribuição do Diagnóstico por Escolaridade',
             labels={'EducationLevel': 'Nível de Escolaridade', 'count': 'Contagem'}
-        )
-        st.plotly_chart(fig_education_count, use_container_width=True)
+        ), cohort=cohort_key(cohort))
+        plotly_chart(fig_education_count, use_container_width=True)
     with col2:
-        fig_education_prop = px.histogram(
-            df_filtrado,
+        fig_education_prop = cached_chart('education_prop', df, lambda: diagnosis_percent_bar(
+            education_table,
             x='EducationLevel',
-            color='Diagnosis',
-            barnorm='percent',
-            text_auto='.2f',
             category_orders={'EducationLevel': education_order},
             title='Proporção do Diagnóstico por Escolaridade (%)',
             labels={'EducationLevel': 'Nível de Escolaridade', 'percent': 'Porcentagem'}
-        )
-        st.plotly_chart(fig_education_prop, use_container_width=True)
+        ), cohort=cohort_key(cohort))
+        plotly_chart(fig_education_prop, use_container_width=True)
+
+render_panel()
@@ -1,24 +1,20 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+
+from dashboard.charts import DOWNSAMPLE_THRESHOLD, diagnosis_count_bar, diagnosis_percent_bar, large_scatter
+from dashboard.cube import cohort_crosstab, cohort_filters, cohort_key
+from dashboard.data import load_data
+from dashboard.figure_cache import cached_chart, quantize_range
+from dashboard.profiling import measure, plotly_chart, render_panel, start_rerun
 
 st.set_page_config(
     page_title="Análise Clínica",
     page_icon="🩺",
     layout="wide"
 )
+start_rerun('Análise Clínica')
 
-@st.cache_data
-def load_data():
-    try:
-        df = pd.read_csv('alzheimers_disease_data.csv')
-        df.drop(columns=["PatientID", "DoctorInCharge"], inplace=True)
-        return df
-    except FileNotFoundError:
-        st.error("'alzheimers_disease_data.csv' não encontrado")
-        return None
-
-df = load_data()
+with measure('load', 'load_data'):
+    df = load_data()
 
 st.title("🩺 Análise Clínica e de Comorbidades")
 
@@ -26,27 +22,51 @@ if df is not None:
     st.header('Análise de Relações Clínicas')
     
 
-    fig_mmse_age_scatter = px.scatter(
+    scatter_mode = 'sample'
+    full_resolution = False
+    if len(df) > DOWNSAMPLE_THRESHOLD:
+        st.sidebar.subheader("Gráficos de dispersão")
+        scatter_mode = st.sidebar.radio(
+            "Modo de exibição:",
+            ['sample', 'density'],
+            format_func={'sample': 'Amostra estratificada', 'density': 'Densidade'}.get
+        )
+        full_resolution = st.sidebar.checkbox("Resolução completa (pode travar o navegador)")
+
+    def scatter_caption(fig):
+        shown, total = fig['layout']['meta']['shown'], fig['layout']['meta']['total']
+        if shown == 0:
+            st.caption(f"Exibindo a densidade de {total} pontos.")
+        elif shown < total:
+            st.caption(f"Exibindo {shown} de {total} pontos.")
+
+    fig_mmse_age_scatter = cached_chart('mmse_age_scatter', df, lambda: large_scatter(
         df,
         x='MMSE',
         y='Age',
         color='Diagnosis',
         hover_data=['Gender', 'EducationLevel'],
         labels={'MMSE': 'MMSE (Mini-Exame do Estado Mental)', 'Age': 'Idade', 'Diagnosis': 'Diagnóstico'},
-        title='Relação entre MMSE e Idade'
-    )
-    st.plotly_chart(fig_mmse_age_scatter, use_container_width=True)
+        title='Relação entre MMSE e Idade',
+        mode=scatter_mode,
+        full_resolution=full_resolution
+    )[0], mode=scatter_mode, full_resolution=full_resolution)
+    plotly_chart(fig_mmse_age_scatter, use_container_width=True)
+    scatter_caption(fig_mmse_age_scatter)
 
-    fig_adl_functional_scatter = px.scatter(
+    fig_adl_functional_scatter = cached_chart('adl_functional_scatter', df, lambda: large_scatter(
         df,
         x='FunctionalAssessment',
         y='ADL',
         color='Diagnosis',
         hover_data=['Gender', 'EducationLevel'],
         labels={'FunctionalAssessment': 'Avaliação Funcional', 'ADL': 'ADL (Atividades da Vida Diária)', 'Diagnosis': 'Diagnóstico'},
-        title='Relação entre ADL e Avaliação Funcional'
-    )
-    st.plotly_chart(fig_adl_functional_scatter, use_container_width=True)
+        title='Relação entre ADL e Avaliação Funcional',
+        mode=scatter_mode,
+        full_resolution=full_resolution
+    )[0], mode=scatter_mode, full_resolution=full_resolution)
+    plotly_chart(fig_adl_functional_scatter, use_container_width=True)
+    scatter_caption(fig_adl_functional_scatter)
 
     min_valor = float(df["Age"].min())
     max_valor = float(df["Age"].max())
@@ -56,84 +76,76 @@ if df is not None:
         (min_valor, max_valor)
     )
 
-    df_filtrado = df[(df["Age"] >= limiar[0]) & 
-                            (df["Age"] <= limiar[1])]
+    age_range = quantize_range(limiar)
+    with st.sidebar.expander("Filtrar coorte"):
+        cohort = {**cohort_filters(st, 'filtro'), 'Age': age_range}
 
     st.header('Análise de Comorbidades')
     
     st.subheader('Depressão')
+    with measure('filter', 'depression_table'):
+        depression_table = cohort_crosstab(df, 'Depression', cohort)
     col1, col2 = st.columns(2)
     with col1:
-        fig_depression_count = px.histogram(
-            df_filtrado, 
-            x='Depression', 
-            color='Diagnosis', 
-            barmode='group',
+        fig_depression_count = cached_chart('depression_count', df, lambda: diagnosis_count_bar(
+            depression_table,
+            x='Depression',
             title='Contagem de Diagnóstico por Depressão',
             labels={'Depression': 'Depressão', 'count': 'Contagem', 'Diagnosis': 'Diagnóstico'}
-        )
-        st.plotly_chart(fig_depression_count, use_container_width=True)
+        ), cohort=cohort_key(cohort))
+        plotly_chart(fig_depression_count, use_container_width=True)
     with col2:
-        fig_depression_prop = px.histogram(
-            df_filtrado, 
-            x='Depression', 
-            color='Diagnosis', 
-            barnorm='percent',
-            text_auto='.2f',
+        fig_depression_prop = cached_chart('depression_prop', df, lambda: diagnosis_percent_bar(
+            depression_table,
+            x='Depression',
             title='Proporção de Diagnóstico por Depressão (%)',
             labels={'Depression': 'Depressão', 'percent': 'Porcentagem', 'Diagnosis': 'Diagnóstico'}
-        )
-        st.plotly_chart(fig_depression_prop, use_container_width=True)
+        ), cohort=cohort_key(cohort))
+        plotly_chart(fig_depression_prop, use_container_width=True)
 
     st.subheader('Histórico de Lesão na Cabeça')
+    with measure('filter', 'head_injury_table'):
+        head_injury_table = cohort_crosstab(df, 'HeadInjury', cohort)
     col1, col2 = st.columns(2)
     with col1:
-        fig_head_injury_count = px.histogram(
-            df_filtrado, 
-            x='HeadInjury', 
-            color='Diagnosis', 
-            barmode='group',
+        fig_head_injury_count = cached_chart('head_injury_count', df, lambda: diagnosis_count_bar(
+            head_injury_table,
+            x='HeadInjury',
             title='Contagem de Diagnóstico por Lesão na Cabeça',
             labels={'HeadInjury': 'Lesão na Cabeça', 'count': 'Contagem', 'Diagnosis': 'Diagnóstico'}
-        )
-        st.plotly_chart(fig_head_injury_count, use_container_width=True)
+        ), cohort=cohort_key(cohort))
+        plotly_chart(fig_head_injury_count, use_container_width=True)
     with col2:
-        fig_head_injury_prop = px.histogram(
-            df_filtrado, 
-            x='HeadInjury', 
-            color='Diagnosis', 
-            barnorm='percent',
-            text_auto='.2f',
+        fig_head_injury_prop = cached_chart('head_injury_prop', df, lambda: diagnosis_percent_bar(
+            head_injury_table,
+            x='HeadInjury',
             title='Proporção de Diagnóstico por Lesão na Cabeça (%)',
             labels={'HeadInjury': 'Lesão na Cabeça', 'percent': 'Porcentagem', 'Diagnosis': 'Diagnóstico'}
-        )
-        st.plotly_chart(fig_head_injury_prop, use_container_width=True)
+        ), cohort=cohort_key(cohort))
+        plotly_chart(fig_head_injury_prop, use_container_width=True)
     
     st.subheader('Contagem e proporção de variáveis com alta correlação')
 
     diagnosis_classif = st.selectbox("Variáveis:", ["MMSE", "FunctionalAssessment", "MemoryComplaints", "BehavioralProblems", "ADL"])
 
+    with measure('filter', 'classif_table'):
+        classif_table = cohort_crosstab(df, diagnosis_classif, cohort)
     col1, col2 = st.columns(2)
     with col1:
-        fig_head_injury_count = px.histogram(
-            df_filtrado, 
-            x=diagnosis_classif, 
-            color='Diagnosis', 
-            barmode='group',
+        fig_head_injury_count = cached_chart('classif_count', df, lambda: diagnosis_count_bar(
+            classif_table,
+            x=diagnosis_classif,
             title=f'Contagem de Diagnóstico por {diagnosis_classif}',
             labels={'count': 'Contagem', 'Diagnosis': 'Diagnóstico'}
-        )
-        st.plotly_chart(fig_head_injury_count, use_container_width=True)
+        ), cohort=cohort_key(cohort), variable=diagnosis_classif)
+        plotly_chart(fig_head_injury_count, use_container_width=True)
     with col2:
-        fig_head_injury_prop = px.histogram(
-            df_filtrado, 
-            x=diagnosis_classif, 
-            color='Diagnosis', 
-            barnorm='percent',
-            text_auto='.2f',
+        fig_head_injury_prop = cached_chart('classif_prop', df, lambda: diagnosis_percent_bar(
+            classif_table,
+            x=diagnosis_classif,
             title=f'Proporção de Diagnóstico por {diagnosis_classif}',
             labels={'percent': 'Porcentagem', 'Diagnosis': 'Diagnóstico'}
-        )
-        st.plotly_chart(fig_head_injury_prop, use_container_width=True)
-
+        ), cohort=cohort_key(cohort), variable=diagnosis_classif)
+        plotly_chart(fig_head_injury_prop, use_container_width=True)
 
+render_panel()
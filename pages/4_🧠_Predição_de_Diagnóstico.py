@@ -1,104 +1,50 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import plotly.express as px
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, confusion_matrix
-from sklearn.model_selection import train_test_split, GridSearchCV
+
+from dashboard.charts import confusion_matrix_heatmap, importance_bar, probability_bar
+from dashboard.data import load_data
+from dashboard.figure_cache import cached_chart
+from dashboard.model import get_model
+from dashboard.profiling import measure, plotly_chart, render_panel, start_rerun
+from dashboard.scoring import predict_batch, score_to_tempfile
 
 st.set_page_config(
     page_title="Classificador de Alzheimer",
     page_icon="🧠",
     layout="wide"
 )
+start_rerun('Predição de Diagnóstico')
 
 DIAGNOSIS_MAP = {0: 'Não Alzheimer', 1: 'Alzheimer'}
 GENDER_MAP = {0: 'Homem', 1: 'Mulher'}
 EDUCATION_MAP = {0: 'Nenhum', 1: 'Ensino Médio', 2: 'Bacharelado', 3: 'Superior'}
 BOOL_MAP = {0: 'Não', 1: 'Sim'}
 
-@st.cache_data
-def load_data():
-    """Carrega o dataset e o retorna, mantendo em cache para performance."""
-    try:
-        df = pd.read_csv('alzheimers_disease_data.csv')
-        df = df.drop(columns=["PatientID", "DoctorInCharge"])
-        return df
-    except FileNotFoundError:
-        st.error("Arquivo 'alzheimers_disease_data.csv' não encontrado. Verifique se ele está na pasta correta.")
-        return None
-    except Exception as e:
-        st.error(f"Ocorreu um erro ao carregar o arquivo: {e}")
-        return None
-
-@st.cache_resource
-def train_classification_model(df):
-    """
-    Usa GridSearchCV para encontrar os melhores hiperparâmetros e treinar o modelo.
-    """
-    try:
-        FEATURES = [col for col in df.columns if col != 'Diagnosis']
-        TARGET = 'Diagnosis'
-
-        X = df[FEATURES]
-        y = df[TARGET]
-
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.25, random_state=42, stratify=y
-        )
-
-        param_grid = {
-            'n_estimators': [100, 150, 200],
-            'max_depth': [10, 20, None], # None = sem limite de profundidade
-            'min_samples_split': [2, 5]
-        }
-
-        rf = RandomForestClassifier(random_state=42)
-
-        grid_search = GridSearchCV(
-            estimator=rf,
-            param_grid=param_grid,
-            cv=3,
-            n_jobs=-1,
-            scoring='accuracy'
-        )
-
-        st.write("Iniciando a busca pelos melhores hiperparâmetros...")
-        grid_search.fit(X_train, y_train)
-        st.write("O melhor modelo foi encontrado.")
-
-        best_model = grid_search.best_estimator_
-        best_params = grid_search.best_params_
-
-        feature_importances = pd.DataFrame({
-            'feature': FEATURES,
-            'importance': best_model.feature_importances_
-        }).sort_values('importance', ascending=False)
-
-        return best_model, X_test, y_test, FEATURES, feature_importances, best_params
-
-    except KeyError as e:
-        st.error(f"Erro: A coluna {e} não foi encontrada no seu dataset.")
-        return None, None, None, None, None, None
-
-
 st.title("🧠 Classificador de Doença de Alzheimer")
 st.markdown("Esta ferramenta utiliza uma Random Forest para prever a probabilidade de um diagnóstico de Alzheimer com base nos dados do paciente.")
 
-df_data = load_data()
+with measure('load', 'load_data'):
+    df_data = load_data()
 
 if df_data is not None:
-    model_components = train_classification_model(df_data)
+    with measure('load', 'get_model'):
+        artifact, is_stale = get_model(df_data)
     
-    if model_components and all(comp is not None for comp in model_components):
-        model, X_test, y_test, FEATURES, feature_importances, best_params = model_components 
+    if artifact is not None:
+        model = artifact['model']
+        FEATURES = artifact['features']
+        feature_importances = artifact['feature_importances']
+        best_params = artifact['best_params']
+        metrics = artifact['metrics']
+
+        if is_stale:
+            st.info("O dataset mudou e um novo modelo está sendo treinado em segundo plano. Exibindo o modelo anterior.")
 
         st.sidebar.header("Insira os Dados do Paciente")
         input_data = {}
 
         for feature in FEATURES:
-            if df_data[feature].dtype in ['int64', 'float64'] and df_data[feature].nunique() > 5:
+            if pd.api.types.is_numeric_dtype(df_data[feature]) and df_data[feature].nunique() > 5:
                 min_val = float(df_data[feature].min())
                 max_val = float(df_data[feature].max())
                 mean_val = float(df_data[feature].mean())
@@ -116,8 +62,8 @@ if df_data is not None:
         if st.sidebar.button("Classificar Diagnóstico", type="primary"):
             input_df = pd.DataFrame([input_data])[FEATURES]
 
-            prediction = model.predict(input_df)
-            prediction_proba = model.predict_proba(input_df)
+            with measure('compute', 'predict_batch'):
+                prediction, prediction_proba = predict_batch(model, input_df)
             
             predicted_diagnosis_str = DIAGNOSIS_MAP[prediction[0]]
             confidence = prediction_proba[0][prediction[0]]
@@ -134,40 +80,83 @@ if df_data is not None:
                 st.metric(label="Confiança do Modelo na Previsão", value=f"{confidence:.2%}")
             
             with col2:
-                fig_proba = px.bar(
-                    x=[f"{p:.1%}" for p in prediction_proba[0]],
-                    y=list(DIAGNOSIS_MAP.values()),
-                    orientation='h',
-                    labels={'x': 'Probabilidade', 'y': 'Diagnóstico'},
-                    title='Probabilidade de Cada Classe',
-                    text=[f"{p:.1%}" for p in prediction_proba[0]]
-                )
-                fig_proba.update_traces(marker_color=['green', 'red'])
-                st.plotly_chart(fig_proba, use_container_width=True)
+                fig_proba = probability_bar(prediction_proba[0], list(DIAGNOSIS_MAP.values()))
+                plotly_chart(fig_proba, use_container_width=True)
         else:
             st.info("Ajuste os parâmetros na barra lateral e clique em 'Classificar Diagnóstico'.")
 
-        with st.expander("Ver Performance e Detalhes do Modelo"):
-            st.subheader("Performance (em dados de teste)")
-            y_pred_test = model.predict(X_test)
-            accuracy = accuracy_score(y_test, y_pred_test)
-            st.metric(label="Acurácia Geral", value=f"{accuracy:.2%}")
-
-            st.subheader("Matriz de Confusão")
-            cm = confusion_matrix(y_test, y_pred_test)
-            fig_cm = px.imshow(cm, text_auto=True,
-                               labels=dict(x="Predição", y="Verdadeiro"),
-                               x=list(DIAGNOSIS_MAP.values()), y=list(DIAGNOSIS_MAP.values()),
-                               color_continuous_scale='Blues')
-            st.plotly_chart(fig_cm)
-
-            st.subheader("Importância das Variáveis")
-            st.markdown("Mostra o impacto de cada variável na decisão do modelo.")
-            fig_imp = px.bar(feature_importances.head(15), 
-                             x='importance', y='feature', orientation='h',
-                             title='Top 15 Variáveis Mais Importantes')
-            fig_imp.update_layout(yaxis={'categoryorder':'total ascending'})
-            st.plotly_chart(fig_imp)
-
-            st.subheader("Melhores Hiperparâmetros Encontrados")
-            st.json(best_params)
\ No newline at end of file
+        st.header("Classificação em Lote")
+        st.markdown("Envie um arquivo CSV ou Parquet com as colunas usadas pelo modelo para classificar uma coorte inteira.")
+        uploaded = st.file_uploader("Arquivo de pacientes", type=['csv', 'parquet'])
+
+        if uploaded is not None and st.button("Classificar Arquivo"):
+            progress_bar = st.progress(0.0, text="Classificando...")
+            try:
+                scored_path, rows = score_to_tempfile(
+                    model, FEATURES, uploaded, uploaded.name,
+                    on_progress=lambda p, n: progress_bar.progress(p, text=f"{n} pacientes classificados")
+                )
+                # A sessão guarda só o caminho do resultado em disco; o anterior é apagado.
+                previous = st.session_state.get('batch_result')
+                if previous is not None:
+                    previous[2].unlink(missing_ok=True)
+                st.session_state['batch_result'] = (uploaded.file_id, rows, scored_path)
+            except ValueError as e:
+                st.error(f"Erro ao classificar o arquivo: {e}")
+            progress_bar.empty()
+
+        batch_result = st.session_state.get('batch_result')
+        if uploaded is not None and batch_result and batch_result[0] == uploaded.file_id:
+            _, rows, scored_path = batch_result
+            try:
+                scored_csv = open(scored_path, 'rb')
+            except FileNotFoundError:
+                # Resultados antigos são apagados do disco (ver ``dashboard.scoring``).
+                st.info("O resultado expirou. Clique em 'Classificar Arquivo' para gerá-lo novamente.")
+            else:
+                with scored_csv:
+                    st.success(f"{rows} pacientes classificados.")
+                    st.download_button(
+                        "Baixar resultado (CSV)",
+                        data=scored_csv,
+                        file_name=f"{uploaded.name.rsplit('.', 1)[0]}_classificado.csv",
+                        mime='text/csv'
+                    )
+
+        # Um st.expander executa o conteúdo mesmo fechado; com o toggle as figuras
+        # só são montadas quando o usuário pede, e ficam em cache por versão do modelo.
+        model_version = (artifact.get('fingerprint'), artifact.get('trained_at'))
+        if st.toggle("Ver Performance e Detalhes do Modelo"):
+            with st.container(border=True):
+                st.subheader("Performance (em dados de teste)")
+                st.metric(label="Acurácia Geral", value=f"{metrics['accuracy']:.2%}")
+
+                st.subheader("Matriz de Confusão")
+                fig_cm = cached_chart('confusion_matrix', df_data, lambda: confusion_matrix_heatmap(
+                    metrics['confusion_matrix'], list(DIAGNOSIS_MAP.values())
+                ), model=model_version)
+                plotly_chart(fig_cm)
+
+                st.subheader("Importância das Variáveis")
+                st.markdown("Mostra o impacto de cada variável na decisão do modelo.")
+
+                fig_imp = cached_chart('feature_importance', df_data, lambda: importance_bar(feature_importances), model=model_version)
+                plotly_chart(fig_imp)
+
+                st.subheader("Melhores Hiperparâmetros Encontrados")
+                st.json(best_params)
+                search = artifact.get('search')
+                if search:
+                    st.caption(
+                        f"Busca '{search['strategy']}' ({search['estimator']}): "
+                        f"{search['wall_seconds']:.1f}s de relógio, {search['cpu_seconds']:.1f}s de CPU, "
+                        f"acurácia na validação cruzada {search['cv_accuracy']:.2%}."
+                    )
+                incremental = artifact.get('incremental')
+                if incremental:
+                    st.caption(
+                        f"Treino incremental: {incremental['rows']} linhas lidas em blocos, "
+                        f"{incremental['fits']} treinos; teste com {metrics['test_size']} linhas do reservatório."
+                    )
+
+render_panel()
@@ -0,0 +1,77 @@
+import streamlit as st
+
+from dashboard.charts import cohort_rate_bar
+from dashboard.cube import CUBE_COLUMNS, LABELS, TITLES, cohort_filters, cohort_key, cohort_rates, count_cube
+from dashboard.data import load_data
+from dashboard.figure_cache import cached_chart
+from dashboard.profiling import measure, plotly_chart, render_panel, start_rerun
+
+st.set_page_config(
+    page_title="Comparação de Coortes",
+    page_icon="⚖️",
+    layout="wide"
+)
+start_rerun('Comparação de Coortes')
+
+AGE_BAND_YEARS = 5
+
+with measure('load', 'load_data'):
+    df = load_data()
+
+st.title("⚖️ Comparação de Coortes")
+st.markdown("Monte duas coortes e compare a taxa de diagnóstico de Alzheimer entre elas. Filtros sem nenhum valor marcado incluem todos os pacientes.")
+
+if df is not None:
+    with measure('load', 'count_cube'):
+        cube = count_cube(df)
+    min_age, max_age = int(cube.values['Age'][0]), int(cube.values['Age'][-1])
+
+    cohorts = {}
+    rates = {}
+    for column, (key, name) in zip(st.columns(2), [('a', 'Coorte A'), ('b', 'Coorte B')]):
+        with column:
+            with st.container(border=True):
+                st.subheader(name)
+                age = st.slider("Idade:", min_age, max_age, (min_age, max_age), key=f'{key}_age')
+                cohort = cohort_filters(st, key)
+                if age != (min_age, max_age):
+                    cohort['Age'] = age
+
+            with measure('filter', f'totals_{key}'):
+                totals = cube.totals(cohort)
+            patients = int(totals.sum())
+            rates[name] = totals[1] / patients * 100 if patients else None
+            delta = None
+            if name == 'Coorte B' and None not in rates.values():
+                delta = f"{rates['Coorte B'] - rates['Coorte A']:+.1f} p.p. em relação à Coorte A"
+            col1, col2 = st.columns(2)
+            col1.metric("Pacientes", f"{patients:,}".replace(',', '.'))
+            col2.metric(
+                "Taxa de Alzheimer", "—" if rates[name] is None else f"{rates[name]:.1f}%",
+                delta=delta, delta_color='off'
+            )
+            cohorts[name] = cohort
+
+    st.header('Taxa de Alzheimer por Variável')
+    by = st.selectbox("Comparar por:", [*CUBE_COLUMNS, 'Age'], format_func=TITLES.get)
+    with measure('filter', 'cohort_rates'):
+        table = cohort_rates(cube, cohorts, by, AGE_BAND_YEARS, LABELS.get(by))
+
+    fig_rates = cached_chart('cohort_rates', df, lambda: cohort_rate_bar(
+        table,
+        x=by,
+        title=f'Taxa de Alzheimer por {TITLES[by]}',
+        labels={by: TITLES[by], 'rate': 'Taxa de Alzheimer (%)', 'cohort': 'Coorte', 'patients': 'Pacientes'}
+    ), by=by, a=cohort_key(cohorts['Coorte A']), b=cohort_key(cohorts['Coorte B']))
+    plotly_chart(fig_rates, use_container_width=True)
+
+    st.dataframe(
+        table.rename(columns={
+            by: TITLES[by], 'cohort': 'Coorte', 'patients': 'Pacientes',
+            'alzheimer': 'Com Alzheimer', 'rate': 'Taxa (%)',
+        }).style.format({'Taxa (%)': '{:.1f}'}, na_rep='—'),
+        hide_index=True,
+        use_container_width=True
+    )
+
+render_panel()